@@ -1,76 +1,282 @@
 import json
-import yaml
-from openai import OpenAI
-from tools import discover_tools
+import asyncio
+from runtime import get_runtime
+from termination import CompletionToolPolicy
+from streaming import StreamAccumulator
+from context_budget import ContextBudget
+from cancellation import AgentCancelled
+from rate_limit import classify_error
+from tools.base_tool import tool_deadline
 
 class OpenRouterAgent:
-    def __init__(self, config_path="config.yaml", silent=False):
-        # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path="config.yaml", silent=False, runtime=None, tools=None, exclude_tools=(), tool_concurrency=None, termination=None):
+        # Shared runtime holds the parsed config, the pooled client and the tool registry
+        self.runtime = runtime or get_runtime(config_path, silent=silent)
+        self.config = self.runtime.config
         
         # Silent mode for orchestrator (suppresses debug output)
         self.silent = silent
         
-        # Initialize OpenAI client with OpenRouter
-        self.client = OpenAI(
-            base_url=self.config['openrouter']['base_url'],
-            api_key=self.config['openrouter']['api_key']
-        )
-        
-        # Discover tools dynamically
-        self.discovered_tools = discover_tools(self.config, silent=self.silent)
+        # Per-role tool subset (None means every discovered tool)
+        tool_names = self.runtime.registry.select(tools, exclude_tools)
+        self.discovered_tools = self.runtime.registry.tools(tool_names)
         
-        # Build OpenRouter tools array
-        self.tools = [tool.to_openrouter_schema() for tool in self.discovered_tools.values()]
+        # OpenRouter tools array (precomputed by the registry)
+        self.tools = self.runtime.registry.schemas(tool_names)
         
         # Build tool mapping
         self.tool_mapping = {name: tool.execute for name, tool in self.discovered_tools.items()}
+        
+        # Cap on tool calls from one assistant turn that may run at the same time
+        if tool_concurrency is None:
+            tool_concurrency = self.config.get('agent', {}).get('tool_concurrency', 4)
+        self.tool_concurrency = max(1, tool_concurrency)
+        
+        # When the agent loop stops (default: when mark_task_complete is called)
+        self.termination = termination or CompletionToolPolicy()
+        
+        # Keeps the message history within the prompt token budget; totals go to the runtime's context_stats
+        self.budget = ContextBudget.from_config(self.config, stats=self.runtime.context_stats)
+        
+        # Spans for iterations, LLM calls and tool calls (shared, no-op unless tracing is enabled)
+        self.tracer = self.runtime.tracer
     
     
-    def call_llm(self, messages):
-        """Make OpenRouter API call with tools"""
-        try:
-            response = self.client.chat.completions.create(
-                model=self.config['openrouter']['model'],
-                messages=messages,
-                tools=self.tools
-            )
+    async def call_llm(self, messages, on_token=None, timeout=None, context_fit=None):
+        """
+        Make OpenRouter API call with tools.
+        With on_token the completion is streamed: content deltas are passed to
+        on_token as they arrive and the chunks are assembled into one response.
+        With timeout the whole call is bounded and asyncio.TimeoutError is raised
+        when it runs out. context_fit (what ContextBudget.fit did to messages)
+        is recorded on the span.
+        """
+        with self.tracer.span("llm.call", model=self.config['openrouter']['model'], messages=len(messages),
+                              stream=on_token is not None) as span:
+            if context_fit is not None:
+                span.set(**{f"context_{key}": value for key, value in context_fit.items()})
+            try:
+                response = await asyncio.wait_for(self._create_completion(messages, on_token, timeout), timeout)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                raise Exception(f"LLM call failed: {str(e)}")
+            
+            if span.recording:
+                usage = getattr(response, 'usage', None)
+                span.set(
+                    prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                    completion_tokens=getattr(usage, 'completion_tokens', None),
+                    tool_calls=len(response.choices[0].message.tool_calls or [])
+                )
             return response
-        except Exception as e:
-            raise Exception(f"LLM call failed: {str(e)}")
     
-    def handle_tool_call(self, tool_call):
-        """Handle a tool call and return the result message"""
-        try:
-            # Extract tool name and arguments
-            tool_name = tool_call.function.name
-            tool_args = json.loads(tool_call.function.arguments)
+    async def _create_completion(self, messages, on_token, timeout):
+        # Non-streamed calls may be hedged; a streamed one has already shown its tokens
+        hedger = self.runtime.hedger
+        if on_token is None and hedger.enabled:
+            return await hedger.run(
+                lambda overrides: self._send_completion(messages, None, timeout, overrides),
+                self.config['openrouter']['model']
+            )
+        return await self._send_completion(messages, on_token, timeout)
+    
+    async def _send_completion(self, messages, on_token, timeout, overrides=None):
+        """
+        Send the request through the runtime's rate limiter, retrying retryable
+        errors (429, 5xx, connection errors, timeouts) with jittered backoff.
+        A stream that already produced tokens is never retried.
+        """
+        limiter = self.runtime.rate_limiter
+        estimated_tokens = sum(self.budget.count(message) for message in messages)
+        emitted = [False]
+        
+        def token_callback(token):
+            emitted[0] = True
+            on_token(token)
+        
+        attempt = 0
+        while True:
+            reservation = await limiter.acquire(estimated_tokens)
+            try:
+                response = await self._request_completion(messages, on_token and token_callback, timeout, overrides)
+            except Exception as e:
+                retryable, overloaded, retry_after = classify_error(e)
+                limiter.release(reservation, succeeded=False, overloaded=overloaded, retry_after=retry_after)
+                if not retryable or emitted[0] or attempt >= limiter.max_retries:
+                    raise
+                await asyncio.sleep(limiter.backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled (e.g. by the caller's deadline): just give the slot back
+                limiter.release(reservation, succeeded=False)
+                raise
             
-            # Call appropriate tool from tool_mapping
-            if tool_name in self.tool_mapping:
-                tool_result = self.tool_mapping[tool_name](**tool_args)
-            else:
-                tool_result = {"error": f"Unknown tool: {tool_name}"}
+            usage = getattr(response, 'usage', None)
+            limiter.release(reservation, tokens_used=getattr(usage, 'total_tokens', None))
+            return response
+    
+    async def _request_completion(self, messages, on_token, timeout, overrides=None):
+        # Only send a tools array when this agent has tools
+        request_kwargs = {"tools": self.tools} if self.tools else {}
+        if timeout is not None:
+            request_kwargs["timeout"] = timeout
+        # Hedged duplicates may target another model or provider
+        request_kwargs["model"] = self.config['openrouter']['model']
+        request_kwargs.update(overrides or {})
+        
+        if on_token is None:
+            return await self.runtime.async_client.chat.completions.create(
+                messages=messages,
+                **request_kwargs
+            )
+        
+        stream = await self.runtime.async_client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_kwargs
+        )
+        accumulator = StreamAccumulator(on_token)
+        async for chunk in stream:
+            accumulator.add(chunk)
+        return accumulator.response()
+    
+    def execute_tool(self, tool_name, tool_args):
+        """Call the named tool from tool_mapping and return its raw result"""
+        if tool_name in self.tool_mapping:
+            return self.tool_mapping[tool_name](**tool_args)
+        return {"error": f"Unknown tool: {tool_name}"}
+    
+    def _tool_message(self, tool_call, tool_name, tool_result):
+        """Build the tool result message for a tool call"""
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call.id,
+            "name": tool_name,
+            "content": json.dumps(tool_result)
+        }
+    
+    async def _shared_execution(self, tool_name, tool_args):
+        """
+        Execution shared by coalesced callers. It runs without the first caller's
+        deadline, so a waiter with a later deadline never gets a result cut short
+        for someone else; each caller still stops waiting at its own deadline.
+        """
+        tool_deadline.set(None)
+        return await self.runtime.run_blocking(self.execute_tool, tool_name, tool_args)
+    
+    async def ahandle_tool_call(self, tool_call, cancel_token=None):
+        """
+        Run a (blocking) tool call on the shared executor without blocking the event loop.
+        Idempotent tools go through the runtime's single-flight layer, so identical calls
+        already in flight from any agent are coalesced into one execution.
+        With cancel_token the call is bounded by its deadline, which tools can
+        read through BaseTool.remaining_time() to limit their own I/O.
+        """
+        tool_name = tool_call.function.name
+        timeout = cancel_token.remaining() if cancel_token is not None else None
+        with self.tracer.span("tool.call", tool=tool_name) as span:
+            context_token = tool_deadline.set(cancel_token.deadline if cancel_token is not None else None)
+            try:
+                tool_args = json.loads(tool_call.function.arguments)
+                tool = self.discovered_tools.get(tool_name)
+                
+                if tool is not None and tool.idempotent:
+                    key = (tool_name, json.dumps(tool_args, sort_keys=True))
+                    execution = self.runtime.single_flight.do(key, lambda: self._shared_execution(tool_name, tool_args))
+                else:
+                    execution = self.runtime.run_blocking(self.execute_tool, tool_name, tool_args)
+                tool_result = await asyncio.wait_for(execution, timeout)
+            except asyncio.TimeoutError:
+                tool_result = {"error": f"Tool {tool_name} did not finish before the agent's deadline"}
+                span.set(timed_out=True)
+            except Exception as e:
+                tool_result = {"error": f"Tool execution failed: {str(e)}"}
+            finally:
+                tool_deadline.reset(context_token)
             
-            # Return tool result message
-            return {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": tool_name,
-                "content": json.dumps(tool_result)
+            message = self._tool_message(tool_call, tool_name, tool_result)
+            span.set(result_bytes=len(message["content"]))
+            return message
+    
+    def _tool_call_dicts(self, tool_calls):
+        """Plain dict form of tool calls (works for streamed and non-streamed responses)"""
+        if not tool_calls:
+            return None
+        return [
+            {
+                "id": tool_call.id,
+                "type": "function",
+                "function": {
+                    "name": tool_call.function.name,
+                    "arguments": tool_call.function.arguments
+                }
             }
+            for tool_call in tool_calls
+        ]
+    
+    def _separated(self, on_token, needs_separator):
+        """Wrap on_token so a new message's content starts after a blank line"""
+        if not needs_separator:
+            return on_token
+        pending = [True]
         
-        except Exception as e:
-            return {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "name": tool_name,
-                "content": json.dumps({"error": f"Tool execution failed: {str(e)}"})
-            }
+        def callback(token):
+            if pending[0]:
+                pending[0] = False
+                on_token("\n\n")
+            on_token(token)
+        return callback
+    
+    async def handle_tool_calls(self, tool_calls, cancel_token=None):
+        """
+        Run independent tool calls concurrently (bounded by tool_concurrency).
+        Result messages are returned in the same order as tool_calls.
+        """
+        semaphore = asyncio.Semaphore(self.tool_concurrency)
+        
+        async def bounded(tool_call):
+            async with semaphore:
+                return await self.ahandle_tool_call(tool_call, cancel_token)
+        
+        return await asyncio.gather(*(bounded(tool_call) for tool_call in tool_calls))
+    
+    async def stream(self, user_input: str):
+        """Run the agent and yield its content as it is generated"""
+        queue = asyncio.Queue()
+        done = object()
+        
+        task = asyncio.ensure_future(self.run(user_input, on_token=queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(done))
+        try:
+            while True:
+                token = await queue.get()
+                if token is done:
+                    break
+                yield token
+            # Surface any error from the run
+            task.result()
+        finally:
+            if not task.done():
+                task.cancel()
     
-    def run(self, user_input: str):
-        """Run the agent with user input and return FULL conversation content"""
+    async def run(self, user_input: str, on_token=None, cancel_token=None):
+        """
+        Run the agent with user input and return FULL conversation content.
+        If on_token is given, LLM output is streamed to it token by token.
+        If cancel_token is given, it is checked before every LLM call and every
+        batch of tool calls, its deadline bounds those calls, and AgentCancelled
+        is raised once it has been triggered or has expired.
+        """
+        with self.tracer.span("agent.run", stream=on_token is not None) as span:
+            response = await self._run_loop(user_input, on_token, cancel_token, span)
+            span.set(response_chars=len(response))
+            return response
+    
+    async def _run_loop(self, user_input: str, on_token, cancel_token, span):
+        """The agentic loop behind run(); span is the run's trace span"""
         # Initialize messages with system prompt and user input
         messages = [
             {
@@ -91,53 +297,82 @@ class OpenRouterAgent:
         iteration = 0
         
         while iteration < max_iterations:
-            iteration += 1
-            if not self.silent:
-                print(f"🔄 Agent iteration {iteration}/{max_iterations}")
-            
-            # Call LLM
-            response = self.call_llm(messages)
+            # Stop cooperatively before the next LLM call if we were cancelled or ran out of time
+            if cancel_token is not None:
+                cancel_token.check("\n\n".join(full_response_content))
             
-            # Add the response to messages
-            assistant_message = response.choices[0].message
-            messages.append({
-                "role": "assistant",
-                "content": assistant_message.content,
-                "tool_calls": assistant_message.tool_calls
-            })
-            
-            # Capture assistant content for full response
-            if assistant_message.content:
-                full_response_content.append(assistant_message.content)
-            
-            # Check if there are tool calls
-            if assistant_message.tool_calls:
+            iteration += 1
+            span.set(iterations=iteration)
+            with self.tracer.span("agent.iteration", iteration=iteration):
                 if not self.silent:
-                    print(f"🔧 Agent making {len(assistant_message.tool_calls)} tool call(s)")
-                # Handle each tool call
-                task_completed = False
-                for tool_call in assistant_message.tool_calls:
+                    print(f"🔄 Agent iteration {iteration}/{max_iterations}")
+                
+                # Call LLM (streamed contents are separated like the joined return value)
+                token_callback = None
+                if on_token is not None:
+                    token_callback = self._separated(on_token, bool(full_response_content))
+                self.budget.fit(messages)
+                try:
+                    timeout = cancel_token.remaining() if cancel_token is not None else None
+                    response = await self.call_llm(messages, on_token=token_callback, timeout=timeout,
+                                                   context_fit=self.budget.last_fit)
+                except asyncio.TimeoutError:
+                    raise AgentCancelled("deadline exceeded", "\n\n".join(full_response_content))
+                
+                # Add the response to messages
+                assistant_message = response.choices[0].message
+                messages.append({
+                    "role": "assistant",
+                    "content": assistant_message.content,
+                    "tool_calls": self._tool_call_dicts(assistant_message.tool_calls)
+                })
+                
+                # Capture assistant content for full response
+                if assistant_message.content:
+                    full_response_content.append(assistant_message.content)
+                
+                # Let the termination policy end the loop on this response
+                if self.termination.should_stop(assistant_message, iteration):
                     if not self.silent:
-                        print(f"   📞 Calling tool: {tool_call.function.name}")
-                    tool_result = self.handle_tool_call(tool_call)
-                    messages.append(tool_result)
+                        print("✅ Termination policy satisfied - exiting loop")
+                    return "\n\n".join(full_response_content)
+                
+                # Check if there are tool calls
+                if assistant_message.tool_calls:
+                    if not self.silent:
+                        print(f"🔧 Agent making {len(assistant_message.tool_calls)} tool call(s)")
+                    tool_calls = list(assistant_message.tool_calls)
+                    
+                    # Calls before the task completion tool run concurrently; the completion
+                    # tool runs after them and anything the model queued behind it is skipped
+                    completion_tool = self.termination.completion_tool
+                    completion_index = next(
+                        (i for i, tool_call in enumerate(tool_calls) if completion_tool and tool_call.function.name == completion_tool),
+                        None
+                    )
+                    batch = tool_calls if completion_index is None else tool_calls[:completion_index]
                     
-                    # Check if this was the task completion tool
-                    if tool_call.function.name == "mark_task_complete":
-                        task_completed = True
+                    if batch and cancel_token is not None:
+                        cancel_token.check("\n\n".join(full_response_content))
+                    if not self.silent:
+                        for tool_call in batch:
+                            print(f"   📞 Calling tool: {tool_call.function.name}")
+                    messages.extend(await self.handle_tool_calls(batch, cancel_token))
+                    
+                    # Check if the task completion tool was called
+                    if completion_index is not None:
+                        if not self.silent:
+                            print(f"   📞 Calling tool: {tool_calls[completion_index].function.name}")
+                        messages.append(await self.ahandle_tool_call(tool_calls[completion_index]))
                         if not self.silent:
                             print("✅ Task completion tool called - exiting loop")
                         # Return FULL conversation content, not just completion message
                         return "\n\n".join(full_response_content)
+                else:
+                    if not self.silent:
+                        print("💭 Agent responded without tool calls - continuing loop")
                 
-                # If task was completed, we already returned above
-                if task_completed:
-                    return "\n\n".join(full_response_content)
-            else:
-                if not self.silent:
-                    print("💭 Agent responded without tool calls - continuing loop")
-            
-            # Continue the loop regardless of whether there were tool calls or not
+                # Continue the loop regardless of whether there were tool calls or not
         
         # If max iterations reached, return whatever content we gathered
         return "\n\n".join(full_response_content) if full_response_content else "Maximum iterations reached. The agent may be stuck in a loop."
\ No newline at end of file
@@ -0,0 +1,183 @@
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Iterator, Set
+from agent import OpenRouterAgent
+from orchestrator import TaskOrchestrator
+from runtime import get_runtime
+from cancellation import AgentCancelled, CancellationToken
+
+def read_queries(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream queries from a JSONL or CSV file.
+    JSONL lines are objects with a "query" (or plain strings); CSV files need a
+    "query" column. An "id" field/column is optional and defaults to the line number.
+    A JSONL line that is not valid JSON or has no query, or a CSV row with an
+    empty "query" cell, is yielded with an "error" instead of a query, so it is
+    reported without stopping the run.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            for row_number, row in enumerate(reader, 1):
+                query = (row.get('query') or '').strip()
+                item_id = row.get('id') or str(row_number)
+                if not query:
+                    # reader.line_num is the file line the row ended on (the header is line 1)
+                    yield {"id": item_id, "line": reader.line_num, "error": "Expected a non-empty \"query\" cell"}
+                    continue
+                yield {"id": item_id, "query": query}
+            return
+
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": str(line_number), "line": line_number, "error": f"Invalid JSON: {e}"}
+                continue
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not isinstance(item.get('query'), str) or not item['query'].strip():
+                item_id = item.get('id', line_number) if isinstance(item, dict) else line_number
+                yield {"id": str(item_id), "line": line_number,
+                       "error": "Expected a JSON object with a non-empty \"query\" string, or a string"}
+                continue
+            yield {"id": str(item.get('id', line_number)), "query": item['query']}
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """Ids already answered successfully in an earlier (possibly killed) run"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if record.get('status') == 'success':
+                done.add(str(record.get('id')))
+    return done
+
+
+class BatchRunner:
+    """Runs many queries concurrently and appends one result line per query"""
+
+    def __init__(self, config_path="config.yaml", mode=None, concurrency=None, max_llm_requests=None):
+        self.config_path = config_path
+        self.runtime = get_runtime(config_path, silent=True)
+        batch_config = self.runtime.config.get('batch', {})
+
+        self.mode = mode or batch_config.get('mode', 'heavy')
+        self.concurrency = max(1, concurrency or batch_config.get('concurrency', 8))
+        self.task_timeout = self.runtime.config['orchestrator']['task_timeout']
+
+        # Override the config's global cap on in-flight LLM requests
+        if max_llm_requests is not None:
+            self.runtime.rate_limiter.max_concurrency = max_llm_requests
+
+        self.succeeded = 0
+        self.failed = 0
+
+    async def run_query(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one query and return its result record"""
+        if "error" in item:
+            # Unreadable input line: record it and let the rest of the batch run
+            return {"id": item["id"], "line": item["line"], "status": "error", "error": item["error"], "elapsed": 0.0}
+
+        record = {"id": item["id"], "query": item["query"], "mode": self.mode}
+        start_time = time.time()
+        try:
+            if self.mode == "single":
+                agent = OpenRouterAgent(self.config_path, silent=True)
+                record["response"] = await agent.run(
+                    item["query"], cancel_token=CancellationToken.with_timeout(self.task_timeout)
+                )
+            else:
+                orchestrator = TaskOrchestrator(self.config_path, silent=True)
+                record["response"] = await orchestrator.orchestrate(item["query"])
+                statuses = list(orchestrator.get_progress_status().values())
+                record["agents"] = {"total": len(statuses), "completed": statuses.count("COMPLETED")}
+            record["status"] = "success"
+        except AgentCancelled as e:
+            record.update(status="timeout", response=e.partial_response, error=e.reason)
+        except Exception as e:
+            record.update(status="error", error=str(e))
+
+        record["elapsed"] = round(time.time() - start_time, 3)
+        return record
+
+    async def run(self, input_path: str, output_path: str):
+        """Process every query in input_path not already completed in output_path"""
+        done = completed_ids(output_path)
+        queries = (item for item in read_queries(input_path) if item["id"] not in done)
+        if done:
+            print(f"Resuming: skipping {len(done)} completed queries")
+
+        # Start on a fresh line if a killed run left a partial one
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            with open(output_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        else:
+            needs_newline = False
+
+        start_time = time.time()
+        with open(output_path, 'a', encoding='utf-8') as output:
+            if needs_newline:
+                output.write("\n")
+
+            async def worker():
+                # Workers pull from one shared iterator, so the input is never loaded whole
+                for item in queries:
+                    record = await self.run_query(item)
+                    output.write(json.dumps(record) + "\n")
+                    output.flush()
+
+                    if record["status"] == "success":
+                        self.succeeded += 1
+                    else:
+                        self.failed += 1
+                    print(f"{'✅' if record['status'] == 'success' else '❌'} {record['id']} "
+                          f"{record['status']} in {record['elapsed']:.1f}s")
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        elapsed = time.time() - start_time
+        processed = self.succeeded + self.failed
+        per_hour = processed * 3600 / elapsed if elapsed > 0 else 0.0
+        print(f"\nProcessed {processed} queries ({self.succeeded} succeeded, {self.failed} failed) "
+              f"in {elapsed:.1f}s - {per_hour:.0f} queries/hour")
+
+
+def main():
+    """Entry point for batch runs"""
+    parser = argparse.ArgumentParser(description="Run many queries from a JSONL or CSV file")
+    parser.add_argument("input", help="JSONL (one {\"id\", \"query\"} object per line) or CSV with a query column")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Result JSONL, appended to and used for resuming")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--mode", choices=["heavy", "single"], help="Orchestrator per query or a single agent")
+    parser.add_argument("--concurrency", type=int, help="Queries processed at the same time")
+    parser.add_argument("--max-llm-requests", type=int, help="Global cap on in-flight LLM requests (0 = unlimited)")
+    args = parser.parse_args()
+
+    try:
+        runner = BatchRunner(args.config, args.mode, args.concurrency, args.max_llm_requests)
+        asyncio.run(runner.run(args.input, args.output))
+    except KeyboardInterrupt:
+        print("\nInterrupted - rerun the same command to resume")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
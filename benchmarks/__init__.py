@@ -0,0 +1 @@
+"""Offline performance benchmarks: mock OpenRouter endpoint, fixture web pages and a runner"""
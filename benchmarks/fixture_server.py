@@ -0,0 +1,96 @@
+"""
+Local HTTP server that stands in for the web pages search_web fetches.
+
+Every path under /page/ returns a deterministic HTML document of roughly
+--page-bytes bytes after a latency drawn like the mock LLM's. Runs in its own
+process and prints its port on stdout:
+
+    python -m benchmarks.fixture_server --page-bytes 50000 --latency-ms 30
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from benchmarks.mock_openrouter import LatencyModel
+
+PARAGRAPH = (
+    "Performance benchmarks measure the overhead of an agent framework separately from the "
+    "latency of the model and the network. This fixture paragraph stands in for real page text. "
+)
+
+
+def build_page(path: str, page_bytes: int) -> bytes:
+    """HTML page whose body repeats a paragraph until it reaches page_bytes"""
+    head = f"<html><head><title>Fixture {path}</title><style>body {{ margin: 0 }}</style>" \
+           f"<script>var fixture = '{path}';</script></head><body><h1>Fixture {path}</h1>"
+    tail = "</body></html>"
+    repeats = max(1, (page_bytes - len(head) - len(tail)) // (len(PARAGRAPH) + 7))
+    return (head + f"<p>{PARAGRAPH}</p>" * repeats + tail).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency: LatencyModel = None
+    page_bytes = 50000
+    lock = threading.Lock()
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with Handler.lock:
+                self._send(json.dumps({"requests": Handler.requests}).encode(), 'application/json')
+            return
+        if not self.path.startswith('/page/'):
+            self.send_error(404)
+            return
+
+        with Handler.lock:
+            Handler.requests += 1
+        time.sleep(self.latency.sample())
+        self._send(build_page(self.path, self.page_bytes), 'text/html; charset=utf-8')
+
+    def _send(self, data: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # search_web closes the connection once it has read enough of a page
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixture web page server for search benchmarks")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--page-bytes", type=int, default=50000)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--jitter", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--sigma", type=float, default=0.5)
+    args = parser.parse_args()
+
+    Handler.latency = LatencyModel(args.latency_ms, args.jitter, args.sigma)
+    Handler.page_bytes = args.page_bytes
+    server = FixtureServer(("127.0.0.1", args.port), Handler)
+
+    print(server.server_address[1], flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
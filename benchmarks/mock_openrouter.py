@@ -0,0 +1,255 @@
+"""
+Local stand-in for the OpenAI-compatible /chat/completions endpoint.
+
+Replies follow a scripted tool-call sequence chosen by how many assistant
+turns the conversation already has, after a latency drawn from a configurable
+distribution. Question generation and synthesis requests are recognised from
+the orchestrator prompts. Runs in its own process and prints its port on
+stdout:
+
+    python -m benchmarks.mock_openrouter --latency-ms 200 --jitter lognormal
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Scripts: one entry per assistant turn; each is a list of (tool name, arguments) calls.
+# The final turn always answers and calls mark_task_complete.
+SCRIPTS = {
+    "direct": [],
+    "search_then_complete": [
+        [("search_web", {"query": "benchmark topic {agent}"}), ("calculate", {"expression": "6 * 7"})]
+    ],
+    "multi_search": [
+        [("search_web", {"query": "benchmark topic {agent} a"}),
+         ("search_web", {"query": "benchmark topic {agent} b"}),
+         ("search_web", {"query": "benchmark topic {agent} c"})],
+        [("calculate", {"expression": "2 ** 10"})]
+    ],
+}
+
+
+class LatencyModel:
+    """Draws response latencies (seconds) from a fixed, uniform or lognormal distribution"""
+
+    def __init__(self, median_ms: float, jitter: str = "lognormal", sigma: float = 0.5):
+        self.median = median_ms / 1000.0
+        self.jitter = jitter
+        self.sigma = sigma
+
+    def sample(self) -> float:
+        if self.jitter == "fixed" or self.median <= 0:
+            return self.median
+        if self.jitter == "uniform":
+            return random.uniform(self.median * (1 - self.sigma), self.median * (1 + self.sigma))
+        return random.lognormvariate(0, self.sigma) * self.median
+
+
+class MockState:
+    def __init__(self, script, latency, answer_words, error_rate=0.0, error_status=429, retry_after=None):
+        self.script = script
+        self.latency = latency
+        self.answer_words = answer_words
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.call_ids = 0
+
+    def next_call_id(self) -> str:
+        with self.lock:
+            self.call_ids += 1
+            return f"call_{self.call_ids}"
+
+
+def build_reply(state: MockState, body: dict) -> dict:
+    """Assistant message for a chat completion request"""
+    messages = body.get("messages", [])
+    prompt = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+    tool_names = {tool["function"]["name"] for tool in body.get("tools") or []}
+    answer = " ".join(f"word{i}" for i in range(state.answer_words))
+
+    # Question generation: "... needs to create {num_agents} different questions ..."
+    match = re.search(r"create (\d+) different questions", prompt)
+    if match:
+        count = int(match.group(1))
+        return {"role": "assistant", "content": json.dumps([f"Benchmark question {i + 1}" for i in range(count)])}
+
+    # Synthesis and other tool-less requests get a plain answer
+    if "mark_task_complete" not in tool_names:
+        return {"role": "assistant", "content": answer}
+
+    turn = sum(1 for m in messages if m.get("role") == "assistant")
+    agent = abs(hash(prompt)) % 10000
+    if turn < len(state.script):
+        calls = [(name, args) for name, args in state.script[turn] if name in tool_names]
+        tool_calls = [
+            {
+                "id": state.next_call_id(),
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "arguments": json.dumps({key: str(value).format(agent=agent) for key, value in args.items()})
+                }
+            }
+            for name, args in calls
+        ]
+        if tool_calls:
+            return {"role": "assistant", "content": None, "tool_calls": tool_calls}
+
+    return {
+        "role": "assistant",
+        "content": answer,
+        "tool_calls": [{
+            "id": state.next_call_id(),
+            "type": "function",
+            "function": {
+                "name": "mark_task_complete",
+                "arguments": json.dumps({"task_summary": "done", "completion_message": "done"})
+            }
+        }]
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/stats'):
+            with self.state.lock:
+                payload = {"requests": self.state.requests, "streamed": self.state.streamed, "errors": self.state.errors}
+            self._send_json(payload)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        with self.state.lock:
+            self.state.requests += 1
+            if body.get("stream"):
+                self.state.streamed += 1
+            failed = random.random() < self.state.error_rate
+            if failed:
+                self.state.errors += 1
+
+        # Injected failures (e.g. 429 with Retry-After) to exercise client backoff
+        if failed:
+            headers = {"Retry-After": str(self.state.retry_after)} if self.state.retry_after is not None else {}
+            self._send_json({"error": {"message": "Injected failure", "code": self.state.error_status}},
+                            self.state.error_status, headers)
+            return
+
+        message = build_reply(self.state, body)
+        latency = self.state.latency.sample()
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+        completion_tokens = len(message.get("content") or "") // 4 + 1
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+
+        if body.get("stream"):
+            self._stream(message, latency, usage)
+            return
+
+        time.sleep(latency)
+        self._send_json({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, message: dict, latency: float, usage: dict):
+        """Server-sent events: half the latency before the first token, the rest spread over the tokens"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": "mock"}
+
+        def send(delta, finish_reason=None, **extra):
+            chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra)
+            self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            self.wfile.flush()
+
+        time.sleep(latency / 2)
+        words = (message.get("content") or "").split(" ") if message.get("content") else []
+        for word in words:
+            send({"content": word + " "})
+            time.sleep(latency / 2 / max(1, len(words)))
+        for index, tool_call in enumerate(message.get("tool_calls") or []):
+            send({"tool_calls": [{"index": index, "id": tool_call["id"], "type": "function",
+                                  "function": {"name": tool_call["function"]["name"], "arguments": tool_call["function"]["arguments"]}}]})
+        send({}, "stop")
+        self.wfile.write(b"data: " + json.dumps(dict(base, choices=[], usage=usage)).encode() + b"\n\n")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload: dict, status: int = 200, headers: dict = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients cancel requests (timeouts, hedging); a closed socket is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenRouter /chat/completions server")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="search_then_complete")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--answer-words", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status of injected failures")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected failures")
+    args = parser.parse_args()
+
+    Handler.state = MockState(
+        SCRIPTS[args.script], LatencyModel(args.latency_ms, args.jitter, args.sigma), args.answer_words,
+        args.error_rate, args.error_status, args.retry_after
+    )
+    server = MockServer(("127.0.0.1", args.port), Handler)
+
+    print(server.server_address[1], flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+End-to-end benchmark of the agent loop and the orchestrator, fully offline.
+
+Starts the mock OpenRouter endpoint and the fixture page server as
+subprocesses, points a temporary copy of config.yaml at them, replaces the
+DuckDuckGo client with one that returns fixture URLs and then drives
+OpenRouterAgent.run and TaskOrchestrator.orchestrate at several concurrency
+levels. Results (p50/p95/p99 latency, throughput, thread count, RSS) are
+printed as a table and optionally written as JSON for comparison:
+
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --compare results.json
+"""
+import os
+import sys
+import json
+import time
+import yaml
+import asyncio
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from agent import OpenRouterAgent
+from orchestrator import TaskOrchestrator
+import tools.search_tool
+
+# Metrics compared by --compare, with whether lower values are better
+COMPARED_METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_per_s": False, "peak_threads": True}
+
+
+class FakeDDGS:
+    """Stands in for ddgs.DDGS, returning fixture server pages for every query"""
+    base_url = None
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def text(self, query, max_results=5):
+        digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+        return [
+            {"title": f"Fixture {digest} {i}", "href": f"{self.base_url}/page/{digest}-{i}", "body": f"Snippet for {query}"}
+            for i in range(max_results)
+        ]
+
+
+def start_server(module: str, *args: str):
+    """Start a benchmark server module in a subprocess and return (process, port)"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", module, *args],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line.strip().isdigit():
+        process.kill()
+        raise RuntimeError(f"{module} failed to start")
+    return process, int(line)
+
+
+def fetch_stats(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def percentile(values, fraction: float) -> float:
+    """Linearly interpolated percentile of a non-empty list"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_config(base_config_path: str, llm_port: int, args) -> str:
+    """Temporary config pointing the agents at the mock endpoint"""
+    with open(base_config_path) as f:
+        config = yaml.safe_load(f)
+
+    config['openrouter']['base_url'] = f"http://127.0.0.1:{llm_port}/v1"
+    config['openrouter']['api_key'] = "benchmark"
+    config['orchestrator']['aggregation_strategy'] = args.aggregation
+    config['search']['max_results'] = args.max_results
+    config['search']['pool_size'] = args.pool_size
+    config['agent']['tool_workers'] = args.tool_workers
+    config.setdefault('cache', {})['enabled'] = args.cache
+    if args.hedging:
+        # Let the latency percentile alone decide when to hedge
+        config.setdefault('hedging', {}).update(enabled=True, min_delay=0)
+    if args.cache:
+        config['cache']['path'] = os.path.join(tempfile.mkdtemp(prefix="mao_bench_"), "cache.sqlite")
+
+    fd, path = tempfile.mkstemp(prefix="mao_bench_", suffix=".yaml")
+    with os.fdopen(fd, 'w') as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+async def measure(scenario: str, call, concurrency: int, runs: int, stats_url: str) -> dict:
+    """Run call(i) `runs` times with at most `concurrency` in flight and summarize"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.02)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    requests_before = fetch_stats(stats_url)["requests"]
+    sampler = asyncio.ensure_future(sample_threads())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    wall_time = time.perf_counter() - started
+    done.set()
+    await sampler
+    requests_after = fetch_stats(stats_url)["requests"]
+
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_per_s": round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+        "llm_requests": requests_after - requests_before,
+        "peak_threads": peak_threads,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+    for name, fraction in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        result[name] = round(percentile(latencies, fraction) * 1000, 1) if latencies else None
+    return result
+
+
+async def run_suite(config_path: str, args, stats_url: str) -> list:
+    results = []
+
+    if "agent" in args.scenarios:
+        for concurrency in args.concurrency:
+            async def call(i):
+                agent = OpenRouterAgent(config_path, silent=True)
+                on_token = (lambda token: None) if args.stream else None
+                await agent.run(f"Benchmark task {i}", on_token=on_token)
+
+            result = await measure("agent", call, concurrency, args.runs, stats_url)
+            results.append(result)
+            print_row(result)
+
+    if "orchestrate" in args.scenarios:
+        for parallel_agents in args.parallel_agents:
+            for concurrency in args.orchestrations:
+                async def call(i):
+                    orchestrator = TaskOrchestrator(config_path, silent=True)
+                    orchestrator.num_agents = parallel_agents
+                    on_token = (lambda token: None) if args.stream else None
+                    await orchestrator.orchestrate(f"Benchmark query {i}", on_token=on_token)
+
+                result = await measure("orchestrate", call, concurrency, args.orchestration_runs, stats_url)
+                result["parallel_agents"] = parallel_agents
+                results.append(result)
+                print_row(result)
+
+    return results
+
+
+def print_header():
+    print(f"{'scenario':<12} {'agents':>6} {'conc':>5} {'runs':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'runs/s':>8} {'threads':>8} {'rss MB':>8}")
+
+
+def print_row(result: dict):
+    def ms(value):
+        return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+    print(f"{result['scenario']:<12} {result.get('parallel_agents', '-'):>6} {result['concurrency']:>5} "
+          f"{result['runs']:>5} {result['errors']:>4} {ms(result['p50_ms'])} {ms(result['p95_ms'])} "
+          f"{ms(result['p99_ms'])} {result['throughput_per_s']:8.2f} {result['peak_threads']:>8} "
+          f"{result['peak_rss_mb']:8.1f}", flush=True)
+
+
+def result_key(result: dict):
+    return (result["scenario"], result.get("parallel_agents"), result["concurrency"])
+
+
+def compare(results: list, baseline_path: str):
+    """Print the relative change of each metric against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+
+    print(f"\nChange vs {baseline_path} (negative is better for latency/threads, positive for throughput):")
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if previous is None:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {100.0 * (new - old) / old:+.1f}%")
+        scenario, parallel_agents, concurrency = result_key(result)
+        print(f"  {scenario} agents={parallel_agents or '-'} conc={concurrency}: " + ", ".join(changes))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def int_list(value: str):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks for the agent and orchestrator")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.yaml"), help="Base config to copy")
+    parser.add_argument("--scenarios", default="agent,orchestrate", help="Comma-separated: agent, orchestrate")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 8, 32], help="Concurrent agent runs")
+    parser.add_argument("--runs", type=int, default=64, help="Agent runs per concurrency level")
+    parser.add_argument("--parallel-agents", type=int_list, default=[2, 4, 8], help="Agents per orchestration")
+    parser.add_argument("--orchestrations", type=int_list, default=[1, 4], help="Concurrent orchestrations")
+    parser.add_argument("--orchestration-runs", type=int, default=8, help="Orchestrations per level")
+    parser.add_argument("--aggregation", choices=["consensus", "tree"], default="consensus")
+    parser.add_argument("--script", default="search_then_complete", help="Mock tool-call script")
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--page-latency-ms", type=float, default=30)
+    parser.add_argument("--jitter", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--page-bytes", type=int, default=50000)
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=16)
+    parser.add_argument("--tool-workers", type=int, default=16)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of LLM requests the mock fails")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--stream", action="store_true", help="Stream LLM output")
+    parser.add_argument("--hedging", action="store_true", help="Enable hedged LLM requests")
+    parser.add_argument("--cache", action="store_true", help="Enable the search cache (fresh temporary store)")
+    parser.add_argument("--output", help="Write JSON results here")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(',')]
+
+    latency_args = ["--jitter", args.jitter, "--sigma", str(args.sigma)]
+    llm_server, llm_port = start_server(
+        "benchmarks.mock_openrouter", "--script", args.script, "--latency-ms", str(args.llm_latency_ms),
+        "--error-rate", str(args.error_rate), "--error-status", str(args.error_status), *latency_args
+    )
+    page_server, page_port = start_server(
+        "benchmarks.fixture_server", "--page-bytes", str(args.page_bytes), "--latency-ms", str(args.page_latency_ms),
+        *latency_args
+    )
+    config_path = write_config(args.config, llm_port, args)
+
+    try:
+        # Searches resolve to fixture pages; the fetches themselves go over real HTTP
+        FakeDDGS.base_url = f"http://127.0.0.1:{page_port}"
+        tools.search_tool.DDGS = FakeDDGS
+
+        print_header()
+        results = asyncio.run(run_suite(config_path, args, f"http://127.0.0.1:{llm_port}/v1/stats"))
+    finally:
+        llm_server.terminate()
+        page_server.terminate()
+        os.unlink(config_path)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "config")},
+        "results": results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
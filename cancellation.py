@@ -0,0 +1,55 @@
+import time
+from typing import Optional
+
+class AgentCancelled(Exception):
+    """Raised inside the agent loop when its cancellation token has been triggered"""
+    
+    def __init__(self, reason: str, partial_response: str = ""):
+        super().__init__(reason)
+        self.reason = reason
+        self.partial_response = partial_response
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation signal shared between the orchestrator and an agent,
+    optionally with a hard deadline (time.monotonic() based). The agent checks it
+    before every LLM and tool call and bounds those calls by remaining().
+    """
+    
+    def __init__(self, deadline: Optional[float] = None):
+        self.reason = None
+        self.deadline = deadline
+    
+    @classmethod
+    def with_timeout(cls, seconds: Optional[float], parent: "CancellationToken" = None) -> "CancellationToken":
+        """Token expiring after seconds, but never later than the parent's deadline"""
+        deadline = time.monotonic() + seconds if seconds else None
+        if parent is not None and parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        return cls(deadline)
+    
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None or self.expired
+    
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (None if there is none)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def cancel(self, reason: str = "cancelled"):
+        if self.reason is None:
+            self.reason = reason
+    
+    def check(self, partial_response: str = ""):
+        """Raise AgentCancelled if cancellation has been requested or the deadline has passed"""
+        if self.reason is not None:
+            raise AgentCancelled(self.reason, partial_response)
+        if self.expired:
+            raise AgentCancelled("deadline exceeded", partial_response)
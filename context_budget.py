@@ -0,0 +1,211 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+ELIDED_PREFIX = "[elided "
+TRUNCATED_MARKER = "... [truncated "
+
+class ContextStats:
+    """Totals of every agent's compaction decisions, kept by the runtime so they outlive the agents"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {
+            "fits": 0,
+            "prompt_tokens_before": 0,
+            "prompt_tokens_after": 0,
+            "tokens_saved": 0,
+            "truncated": 0,
+            "elided": 0,
+            "over_budget": 0
+        }
+
+    def record(self, fit: Dict[str, Any]):
+        with self._lock:
+            self._totals["fits"] += 1
+            for key in ("prompt_tokens_before", "prompt_tokens_after", "tokens_saved", "truncated", "elided"):
+                self._totals[key] += fit[key]
+            self._totals["over_budget"] += int(fit["over_budget"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._totals)
+        before = stats["prompt_tokens_before"]
+        stats["reduction"] = round(stats["tokens_saved"] / before, 4) if before else 0.0
+        return stats
+
+
+class ContextBudget:
+    """
+    Keeps an agent's message history within a prompt token budget.
+
+    Before every LLM call the history is compacted in place:
+    tool results the model has already seen for more than keep_consumed_turns
+    turns are replaced by a short stub, oversized tool results are truncated,
+    and if the prompt still exceeds max_prompt_tokens the oldest tool results
+    are elided first. System, user and assistant messages are never modified.
+    """
+
+    # Per-message overhead for role/name framing
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, max_prompt_tokens: int = 100000, tool_result_max_tokens: int = 4000,
+                 keep_consumed_turns: int = 1, elided_preview_chars: int = 200, model: str = None,
+                 stats: Optional[ContextStats] = None):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.tool_result_max_tokens = tool_result_max_tokens
+        self.keep_consumed_turns = keep_consumed_turns
+        self.elided_preview_chars = elided_preview_chars
+        self._encoding = self._load_encoding(model)
+
+        # Shared totals (the runtime's), fed by every fit()
+        self.stats = stats
+
+        # id(message) -> (content, tokens); content identity tells us when a count is stale
+        self._counts: Dict[int, Any] = {}
+
+        self.metrics = {
+            "fits": 0,
+            "prompt_tokens_before": 0,
+            "prompt_tokens_after": 0,
+            "tokens_saved": 0,
+            "truncated": 0,
+            "elided": 0,
+            "over_budget": 0
+        }
+
+        # What the most recent fit() did, for the llm.call span that follows it
+        self.last_fit: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_config(cls, config: dict, stats: Optional[ContextStats] = None) -> "ContextBudget":
+        context_config = config.get('context', {})
+        return cls(
+            max_prompt_tokens=context_config.get('max_prompt_tokens', 100000),
+            tool_result_max_tokens=context_config.get('tool_result_max_tokens', 4000),
+            keep_consumed_turns=context_config.get('keep_consumed_turns', 1),
+            elided_preview_chars=context_config.get('elided_preview_chars', 200),
+            model=config.get('openrouter', {}).get('model'),
+            stats=stats
+        )
+
+    def _load_encoding(self, model: str):
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model.split('/')[-1]) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
+    def count_text(self, text: str) -> int:
+        """Token count for a string (tiktoken if installed, otherwise ~4 chars per token)"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def count(self, message: Dict[str, Any]) -> int:
+        """Token count for one message, cached until its content changes"""
+        content = message.get("content")
+        cached = self._counts.get(id(message))
+        if cached is not None and cached[0] is content:
+            return cached[1]
+
+        tokens = self.MESSAGE_OVERHEAD + self.count_text(content if isinstance(content, str) else "")
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call["function"] if isinstance(tool_call, dict) else tool_call.function
+            name = function["name"] if isinstance(function, dict) else function.name
+            arguments = function["arguments"] if isinstance(function, dict) else function.arguments
+            tokens += self.count_text(name) + self.count_text(arguments)
+
+        self._counts[id(message)] = (content, tokens)
+        return tokens
+
+    def _elide(self, message: Dict[str, Any]) -> int:
+        """Replace a tool result with a short stub; returns tokens saved"""
+        content = message.get("content") or ""
+        if content.startswith(ELIDED_PREFIX):
+            return 0
+
+        before = self.count(message)
+        preview = content[:self.elided_preview_chars]
+        message["content"] = (
+            f"{ELIDED_PREFIX}{before} tokens of {message.get('name', 'tool')} output already used in an earlier step] "
+            f"{preview}..."
+        )
+        self.metrics["elided"] += 1
+        return before - self.count(message)
+
+    def _truncate(self, message: Dict[str, Any], max_tokens: int) -> int:
+        """Cut a tool result down to about max_tokens; returns tokens saved"""
+        content = message.get("content") or ""
+        before = self.count(message)
+        content_tokens = before - self.MESSAGE_OVERHEAD
+        if content_tokens <= max_tokens or content.startswith(ELIDED_PREFIX) or TRUNCATED_MARKER in content[-40:]:
+            return 0
+
+        keep_chars = max(0, int(len(content) * max_tokens / content_tokens))
+        message["content"] = content[:keep_chars] + f"{TRUNCATED_MARKER}{content_tokens - max_tokens} tokens]"
+        self.metrics["truncated"] += 1
+        return before - self.count(message)
+
+    def fit(self, messages: List[Dict[str, Any]]) -> int:
+        """Compact messages in place and return the resulting prompt token count"""
+        total = sum(self.count(message) for message in messages)
+        before = total
+        truncated = self.metrics["truncated"]
+        elided = self.metrics["elided"]
+
+        # How many assistant turns have seen each tool result
+        seen_by = []
+        assistant_turns = 0
+        for message in reversed(messages):
+            if message.get("role") == "assistant":
+                assistant_turns += 1
+            elif message.get("role") == "tool":
+                seen_by.append((message, assistant_turns))
+        seen_by.reverse()  # oldest first
+
+        for message, turns in seen_by:
+            if turns > self.keep_consumed_turns:
+                total -= self._elide(message)
+            else:
+                total -= self._truncate(message, self.tool_result_max_tokens)
+
+        # Still over the ceiling: elide oldest tool results, consumed ones first
+        if total > self.max_prompt_tokens:
+            for consumed_only in (True, False):
+                for message, turns in seen_by:
+                    if total <= self.max_prompt_tokens:
+                        break
+                    if consumed_only and turns == 0:
+                        continue
+                    total -= self._elide(message)
+
+        if total > self.max_prompt_tokens:
+            self.metrics["over_budget"] += 1
+
+        # Forget counts for messages that are no longer in the history
+        self._counts = {id(message): self._counts[id(message)] for message in messages if id(message) in self._counts}
+
+        self.metrics["fits"] += 1
+        self.metrics["prompt_tokens_before"] = before
+        self.metrics["prompt_tokens_after"] = total
+        self.metrics["tokens_saved"] += before - total
+
+        self.last_fit = {
+            "prompt_tokens_before": before,
+            "prompt_tokens_after": total,
+            "tokens_saved": before - total,
+            "truncated": self.metrics["truncated"] - truncated,
+            "elided": self.metrics["elided"] - elided,
+            "over_budget": total > self.max_prompt_tokens
+        }
+        if self.stats is not None:
+            self.stats.record(self.last_fit)
+        return total
@@ -0,0 +1,147 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+from tracing import current_span
+
+class Hedger:
+    """
+    Issues a duplicate LLM request when the first one is slower than usual.
+
+    The hedge delay is a percentile of recent request latencies (per model),
+    never below min_delay. The duplicate may go to a fallback model or
+    provider; whichever request finishes first wins and the other is
+    cancelled. At most max_fraction of calls are hedged. Shared by every
+    agent of a runtime, so the latency window reflects all recent calls.
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 0.95, min_delay: float = 1.0,
+                 max_fraction: float = 0.1, window: int = 200, min_samples: int = 20,
+                 fallback_model: str = None, fallback_provider: str = None):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_fraction = max_fraction
+        self.window = window
+        self.min_samples = min_samples
+        self.fallback_model = fallback_model or None
+        self.fallback_provider = fallback_provider or None
+
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Hedger":
+        hedging_config = config.get('hedging', {})
+        return cls(
+            enabled=hedging_config.get('enabled', False),
+            percentile=hedging_config.get('percentile', 0.95),
+            min_delay=hedging_config.get('min_delay', 1.0),
+            max_fraction=hedging_config.get('max_fraction', 0.1),
+            window=hedging_config.get('window', 200),
+            min_samples=hedging_config.get('min_samples', 20),
+            fallback_model=hedging_config.get('fallback_model'),
+            fallback_provider=hedging_config.get('fallback_provider')
+        )
+
+    def _delay_for(self, latencies) -> Optional[float]:
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        with self._lock:
+            return self._delay_for(self._latencies.get(model))
+
+    def record(self, model: str, latency: float):
+        with self._lock:
+            latencies = self._latencies.get(model)
+            if latencies is None:
+                latencies = self._latencies[model] = deque(maxlen=self.window)
+            latencies.append(latency)
+
+    def _claim_hedge(self) -> bool:
+        """Count a hedge if the budget allows another one"""
+        with self._lock:
+            if self.counters["hedged"] + 1 > self.max_fraction * self.counters["calls"]:
+                return False
+            self.counters["hedged"] += 1
+            return True
+
+    def hedge_overrides(self) -> Dict[str, Any]:
+        """Request arguments for the duplicate request"""
+        overrides = {}
+        if self.fallback_model:
+            overrides["model"] = self.fallback_model
+        if self.fallback_provider:
+            overrides["extra_body"] = {"provider": {"order": [self.fallback_provider], "allow_fallbacks": True}}
+        return overrides
+
+    async def run(self, send: Callable[[Dict[str, Any]], Awaitable[Any]], model: str) -> Any:
+        """
+        Run send({}) and, if it is still pending after the hedge delay, race it
+        against send(hedge_overrides()). Returns the first successful result.
+        """
+        with self._lock:
+            self.counters["calls"] += 1
+
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(send({}))
+        tasks = [primary]
+
+        def record_primary(task):
+            if not task.cancelled() and task.exception() is None:
+                self.record(model, time.perf_counter() - started)
+        primary.add_done_callback(record_primary)
+
+        try:
+            delay = self.hedge_delay(model)
+            if delay is not None:
+                await asyncio.wait([primary], timeout=delay)
+            if primary.done() or delay is None or not self._claim_hedge():
+                return await primary
+
+            hedge = asyncio.ensure_future(send(self.hedge_overrides()))
+            tasks.append(hedge)
+            span = current_span.get()
+            if span is not None:
+                span.set(hedged=True, hedge_delay=round(delay, 3))
+
+            # First success wins; if one fails, wait for the other
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            with self._lock:
+                                self.counters["hedge_wins"] += 1
+                            if span is not None:
+                                span.set(hedge_won=True)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # A primary that lost still counts, with its latency so far as a lower bound, to keep the tail visible
+            if not primary.done():
+                self.record(model, time.perf_counter() - started)
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedge counters and the current hedge delay per model"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                **self.counters,
+                "hedge_delay": {model: self._delay_for(latencies) for model, latencies in self._latencies.items()}
+            }
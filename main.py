@@ -1,5 +1,20 @@
+import sys
+import asyncio
 from agent import OpenRouterAgent
 
+class TokenPrinter:
+    """Write streamed agent output as soon as it arrives"""
+    
+    def __init__(self):
+        self.started = False
+    
+    def __call__(self, token):
+        if not self.started:
+            self.started = True
+            sys.stdout.write("Agent: ")
+        sys.stdout.write(token)
+        sys.stdout.flush()
+
 def main():
     """Main entry point for the OpenRouter agent"""
     print("OpenRouter Agent with DuckDuckGo Search")
@@ -19,28 +34,37 @@ def main():
         print("2. Installed all dependencies with: pip install -r requirements.txt")
         return
     
-    while True:
-        try:
-            user_input = input("\nUser: ").strip()
-            
-            if user_input.lower() in ['quit', 'exit', 'bye']:
-                print("Goodbye!")
+    # One event loop for the whole session, so the pooled client and its connections are reused across queries
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                user_input = input("\nUser: ").strip()
+                
+                if user_input.lower() in ['quit', 'exit', 'bye']:
+                    print("Goodbye!")
+                    break
+                
+                if not user_input:
+                    print("Please enter a question or command.")
+                    continue
+                
+                print("Agent: Thinking...")
+                printer = TokenPrinter()
+                response = loop.run_until_complete(agent.run(user_input, on_token=printer))
+                if printer.started:
+                    print()
+                else:
+                    print(f"Agent: {response}")
+                
+            except KeyboardInterrupt:
+                print("\n\nExiting...")
                 break
-            
-            if not user_input:
-                print("Please enter a question or command.")
-                continue
-            
-            print("Agent: Thinking...")
-            response = agent.run(user_input)
-            print(f"Agent: {response}")
-            
-        except KeyboardInterrupt:
-            print("\n\nExiting...")
-            break
-        except Exception as e:
-            print(f"Error: {e}")
-            print("Please try again or type 'quit' to exit.")
+            except Exception as e:
+                print(f"Error: {e}")
+                print("Please try again or type 'quit' to exit.")
+    finally:
+        agent.runtime.close_loop(loop)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import time
+import asyncio
 import threading
 import sys
 from orchestrator import TaskOrchestrator
@@ -8,6 +9,12 @@ class OrchestratorCLI:
         self.orchestrator = TaskOrchestrator()
         self.start_time = None
         self.running = False
+        self.streaming = False
+        self.progress_thread = None
+        self.stop_event = threading.Event()
+        
+        # One event loop for the whole session, so the pooled client and its connections are reused across tasks
+        self.loop = asyncio.new_event_loop()
         
         # Extract model name for display
         model_full = self.orchestrator.config['openrouter']['model']
@@ -46,6 +53,7 @@ class OrchestratorCLI:
         # ANSI color codes
         ORANGE = '\033[38;5;208m'  # Orange color
         RED = '\033[91m'           # Red color
+        GREY = '\033[90m'          # Grey color
         RESET = '\033[0m'          # Reset color
         
         if status == "QUEUED":
@@ -58,6 +66,8 @@ class OrchestratorCLI:
             return f"{ORANGE}●{RESET} " + dots
         elif status == "COMPLETED":
             return f"{ORANGE}●{RESET} " + f"{ORANGE}:" * 70 + f"{RESET}"
+        elif status == "CANCELLED":
+            return f"{GREY}⊘{RESET} " + f"{GREY}·" * 70 + f"{RESET}"
         elif status.startswith("FAILED"):
             return f"{RED}✗{RESET} " + f"{RED}×" * 70 + f"{RESET}"
         else:
@@ -99,40 +109,64 @@ class OrchestratorCLI:
         """Monitor and update progress display in separate thread"""
         while self.running:
             self.update_display()
-            time.sleep(1.0)  # Update every 1 second (reduced flicker)
+            self.stop_event.wait(1.0)  # Update every 1 second (reduced flicker)
+    
+    def stop_progress_monitor(self):
+        """Stop the progress display and wait for its last redraw to finish"""
+        self.running = False
+        self.stop_event.set()
+        if self.progress_thread is not None:
+            self.progress_thread.join()
+    
+    def stream_token(self, token):
+        """Print the final answer as it streams in, replacing the progress display"""
+        if not self.streaming:
+            self.streaming = True
+            self.stop_progress_monitor()
+            print("=" * 80)
+            print("FINAL RESULTS")
+            print("=" * 80)
+            print()
+        sys.stdout.write(token)
+        sys.stdout.flush()
     
     def run_task(self, user_input):
         """Run orchestrator task with live progress display"""
         self.start_time = time.time()
         self.running = True
+        self.streaming = False
+        self.stop_event.clear()
         
         # Start progress monitoring in background thread
-        progress_thread = threading.Thread(target=self.progress_monitor, daemon=True)
-        progress_thread.start()
+        self.progress_thread = threading.Thread(target=self.progress_monitor, daemon=True)
+        self.progress_thread.start()
         
         try:
-            # Run the orchestrator
-            result = self.orchestrator.orchestrate(user_input)
+            # Run the orchestrator on the session's event loop, streaming the final answer
+            result = self.loop.run_until_complete(self.orchestrator.orchestrate(user_input, on_token=self.stream_token))
             
             # Stop progress monitoring
-            self.running = False
+            self.stop_progress_monitor()
             
             # Final display update
             self.update_display()
             
-            # Show results
-            print("=" * 80)
-            print("FINAL RESULTS")
-            print("=" * 80)
-            print()
-            print(result)
+            # Show results (already printed token by token if streamed)
+            if not self.streaming:
+                print("=" * 80)
+                print("FINAL RESULTS")
+                print("=" * 80)
+                print()
+                print(result)
+            else:
+                print()
             print()
             print("=" * 80)
             
             return result
             
         except Exception as e:
-            self.running = False
+            self.stop_progress_monitor()
             self.update_display()
             print(f"\nError during orchestration: {str(e)}")
             return None
@@ -157,33 +191,36 @@ class OrchestratorCLI:
             print("2. Installed all dependencies with: pip install -r requirements.txt")
             return
         
-        while True:
-            try:
-                user_input = input("\nUser: ").strip()
-                
-                if user_input.lower() in ['quit', 'exit', 'bye']:
-                    print("Goodbye!")
+        try:
+            while True:
+                try:
+                    user_input = input("\nUser: ").strip()
+                    
+                    if user_input.lower() in ['quit', 'exit', 'bye']:
+                        print("Goodbye!")
+                        break
+                    
+                    if not user_input:
+                        print("Please enter a question or command.")
+                        continue
+                    
+                    print("\nOrchestrator: Starting multi-agent analysis...")
+                    print()
+                    
+                    # Run task with live progress
+                    result = self.run_task(user_input)
+                    
+                    if result is None:
+                        print("Task failed. Please try again.")
+                    
+                except KeyboardInterrupt:
+                    print("\n\nExiting...")
                     break
-                
-                if not user_input:
-                    print("Please enter a question or command.")
-                    continue
-                
-                print("\nOrchestrator: Starting multi-agent analysis...")
-                print()
-                
-                # Run task with live progress
-                result = self.run_task(user_input)
-                
-                if result is None:
-                    print("Task failed. Please try again.")
-                
-            except KeyboardInterrupt:
-                print("\n\nExiting...")
-                break
-            except Exception as e:
-                print(f"Error: {e}")
-                print("Please try again or type 'quit' to exit.")
+                except Exception as e:
+                    print(f"Error: {e}")
+                    print("Please try again or type 'quit' to exit.")
+        finally:
+            self.orchestrator.runtime.close_loop(self.loop)
 
 def main():
     """Main entry point for the orchestrator CLI"""
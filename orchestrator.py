@@ -1,32 +1,80 @@
 import json
-import yaml
 import time
+import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any
 from agent import OpenRouterAgent
+from runtime import get_runtime
+from termination import SingleShotPolicy, StopOnPlainAnswerPolicy
+from cancellation import AgentCancelled, CancellationToken
+
+# Streamed between a synthesis that failed partway and the fallback answer that replaces it
+SYNTHESIS_FAILED_MARKER = "\n\n[Synthesis interrupted - showing the individual agent responses instead]\n\n"
+
+class OrchestrationState:
+    """
+    Per-agent progress and results of one orchestrate() call.
+    on_progress(agent_id, status) is called after every status change.
+    """
+    
+    def __init__(self, on_progress=None):
+        self.agent_progress = {}
+        self.agent_results = {}
+        self.lock = threading.Lock()
+        self.on_progress = on_progress
+    
+    def update(self, agent_id: int, status: str, result: str = None):
+        with self.lock:
+            self.agent_progress[agent_id] = status
+            if result is not None:
+                self.agent_results[agent_id] = result
+        if self.on_progress is not None:
+            self.on_progress(agent_id, status)
+    
+    def snapshot(self) -> Dict[int, str]:
+        with self.lock:
+            return self.agent_progress.copy()
+
 
 class TaskOrchestrator:
     def __init__(self, config_path="config.yaml", silent=False):
-        # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        # Shared runtime: config, client and tools are loaded once for every agent
+        self.runtime = get_runtime(config_path, silent=True)
+        self.config = self.runtime.config
         
         self.num_agents = self.config['orchestrator']['parallel_agents']
         self.task_timeout = self.config['orchestrator']['task_timeout']
         self.aggregation_strategy = self.config['orchestrator']['aggregation_strategy']
+        # Responses combined per synthesis call by the "tree" strategy
+        self.synthesis_fan_in = max(2, self.config['orchestrator'].get('synthesis_fan_in', 4))
+        
+        # Quorum mode: synthesize once enough agents succeeded instead of waiting for stragglers
+        self.quorum = self.config['orchestrator'].get('quorum', 0)
+        self.min_agents = max(1, self.config['orchestrator'].get('min_agents', 1))
+        self.soft_deadline = self.config['orchestrator'].get('soft_deadline', 0)
+        self.late_result_grace = self.config['orchestrator'].get('late_result_grace', 2)
+        
+        # Hard bound on a whole orchestration (0 = only the per-agent task_timeout applies)
+        self.max_wall_time = self.config['orchestrator'].get('max_wall_time', 0)
         self.silent = silent
         
-        # Track agent progress
-        self.agent_progress = {}
-        self.agent_results = {}
-        self.progress_lock = threading.Lock()
+        # Progress of the most recent orchestration; concurrent callers pass their own state
+        self.state = OrchestrationState()
+        
+        # Spans for decomposition, agents and aggregation (no-op unless tracing is enabled)
+        self.tracer = self.runtime.tracer
     
-    def decompose_task(self, user_input: str, num_agents: int) -> List[str]:
+    async def decompose_task(self, user_input: str, num_agents: int, cancel_token: CancellationToken = None) -> List[str]:
         """Use AI to dynamically generate different questions based on user input"""
         
-        # Create question generation agent
-        question_agent = OpenRouterAgent(silent=True)
+        # Create question generation agent without the task completion tool;
+        # it may still research, and stops as soon as it answers without tool calls
+        question_agent = OpenRouterAgent(
+            silent=True,
+            runtime=self.runtime,
+            exclude_tools=('mark_task_complete',),
+            termination=StopOnPlainAnswerPolicy()
+        )
         
         # Get question generation prompt from config
         prompt_template = self.config['orchestrator']['question_generation_prompt']
@@ -35,55 +83,84 @@ class TaskOrchestrator:
             num_agents=num_agents
         )
         
-        # Remove task completion tool to avoid issues
-        question_agent.tools = [tool for tool in question_agent.tools if tool.get('function', {}).get('name') != 'mark_task_complete']
-        question_agent.tool_mapping = {name: func for name, func in question_agent.tool_mapping.items() if name != 'mark_task_complete'}
-        
+        with self.tracer.span("decompose_task", num_agents=num_agents) as span:
+            try:
+                # Get AI-generated questions
+                response = await question_agent.run(generation_prompt, cancel_token=cancel_token)
+                
+                # Parse JSON response
+                questions = self._parse_questions(response)
+                
+                # Validate we got the right number of questions
+                if len(questions) != num_agents:
+                    raise ValueError(f"Expected {num_agents} questions, got {len(questions)}")
+                
+                span.set(questions=len(questions))
+                return questions
+                
+            except (json.JSONDecodeError, ValueError, AgentCancelled) as e:
+                # Fallback: create simple variations if AI fails (repeated for large agent counts)
+                variations = [
+                    f"Research comprehensive information about: {user_input}",
+                    f"Analyze and provide insights about: {user_input}",
+                    f"Find alternative perspectives on: {user_input}",
+                    f"Verify and cross-check facts about: {user_input}"
+                ]
+                span.set(fallback=True, fallback_reason=f"{type(e).__name__}: {e}")
+                return [variations[i % len(variations)] for i in range(num_agents)]
+    
+    def _parse_questions(self, response: str) -> List[str]:
+        """Extract the JSON array of questions, tolerating text or code fences around it"""
+        text = response.strip()
         try:
-            # Get AI-generated questions
-            response = question_agent.run(generation_prompt)
-            
-            # Parse JSON response
-            questions = json.loads(response.strip())
-            
-            # Validate we got the right number of questions
-            if len(questions) != num_agents:
-                raise ValueError(f"Expected {num_agents} questions, got {len(questions)}")
-            
-            return questions
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            # Fallback: create simple variations if AI fails
-            return [
-                f"Research comprehensive information about: {user_input}",
-                f"Analyze and provide insights about: {user_input}",
-                f"Find alternative perspectives on: {user_input}",
-                f"Verify and cross-check facts about: {user_input}"
-            ][:num_agents]
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        
+        # Take the last JSON array of strings embedded in the response
+        decoder = json.JSONDecoder()
+        position = text.rfind('[')
+        while position != -1:
+            try:
+                value, _ = decoder.raw_decode(text, position)
+                if isinstance(value, list) and all(isinstance(item, str) for item in value):
+                    return value
+            except json.JSONDecodeError:
+                pass
+            position = text.rfind('[', 0, position)
+        
+        raise json.JSONDecodeError("No JSON array of questions found", text, 0)
+    
+    @property
+    def agent_progress(self) -> Dict[int, str]:
+        return self.state.agent_progress
     
-    def update_agent_progress(self, agent_id: int, status: str, result: str = None):
+    @property
+    def agent_results(self) -> Dict[int, str]:
+        return self.state.agent_results
+    
+    def update_agent_progress(self, agent_id: int, status: str, result: str = None, state: OrchestrationState = None):
         """Thread-safe progress tracking"""
-        with self.progress_lock:
-            self.agent_progress[agent_id] = status
-            if result is not None:
-                self.agent_results[agent_id] = result
+        (state or self.state).update(agent_id, status, result)
     
-    def run_agent_parallel(self, agent_id: int, subtask: str) -> Dict[str, Any]:
+    async def run_agent_parallel(self, agent_id: int, subtask: str, cancel_token: CancellationToken = None,
+                                 state: OrchestrationState = None) -> Dict[str, Any]:
         """
         Run a single agent with the given subtask.
         Returns result dictionary with agent_id, status, and response.
         """
         try:
-            self.update_agent_progress(agent_id, "PROCESSING...")
+            self.update_agent_progress(agent_id, "PROCESSING...", state=state)
             
             # Use simple agent like in main.py
-            agent = OpenRouterAgent(silent=True)
+            agent = OpenRouterAgent(silent=True, runtime=self.runtime)
             
             start_time = time.time()
-            response = agent.run(subtask)
+            with self.tracer.span("orchestrator.agent", agent_id=agent_id):
+                response = await agent.run(subtask, cancel_token=cancel_token)
             execution_time = time.time() - start_time
             
-            self.update_agent_progress(agent_id, "COMPLETED", response)
+            self.update_agent_progress(agent_id, "COMPLETED", response, state)
             
             return {
                 "agent_id": agent_id,
@@ -91,9 +168,21 @@ class TaskOrchestrator:
                 "response": response,
                 "execution_time": execution_time
             }
+        
+        except AgentCancelled as e:
+            # Stopped cooperatively: cut off by the quorum, or out of time
+            timed_out = cancel_token is not None and cancel_token.expired
+            self.update_agent_progress(agent_id, "FAILED: TIMEOUT" if timed_out else "CANCELLED", state=state)
+            return {
+                "agent_id": agent_id,
+                "status": "timeout" if timed_out else "cancelled",
+                "response": f"Agent {agent_id + 1} cancelled: {e.reason}",
+                "execution_time": time.time() - start_time
+            }
             
         except Exception as e:
             # Simple error handling
+            self.update_agent_progress(agent_id, "FAILED", state=state)
             return {
                 "agent_id": agent_id,
                 "status": "error",
@@ -101,34 +190,100 @@ class TaskOrchestrator:
                 "execution_time": 0
             }
     
-    def aggregate_results(self, agent_results: List[Dict[str, Any]]) -> str:
+    async def aggregate_results(self, agent_results: List[Dict[str, Any]], on_token=None,
+                                cancel_token: CancellationToken = None) -> str:
         """
         Combine results from all agents into a comprehensive final answer.
-        Uses the configured aggregation strategy.
+        Uses the configured aggregation strategy. If on_token is given, the
+        final answer is streamed to it as it is produced. If cancel_token runs
+        out, synthesis falls back to concatenating the responses.
         """
         successful_results = [r for r in agent_results if r["status"] == "success"]
         
         if not successful_results:
-            return "All agents failed to provide results. Please try again."
+            message = "All agents failed to provide results. Please try again."
+            if on_token:
+                on_token(message)
+            return message
         
         # Extract responses for aggregation
         responses = [r["response"] for r in successful_results]
         
         if self.aggregation_strategy == "consensus":
-            return self._aggregate_consensus(responses, successful_results)
+            return await self._aggregate_consensus(responses, successful_results, on_token, cancel_token)
+        elif self.aggregation_strategy == "tree":
+            return await self._aggregate_tree(responses, successful_results, on_token, cancel_token)
         else:
             # Default to consensus
-            return self._aggregate_consensus(responses, successful_results)
+            return await self._aggregate_consensus(responses, successful_results, on_token, cancel_token)
     
-    def _aggregate_consensus(self, responses: List[str], _results: List[Dict[str, Any]]) -> str:
+    async def _aggregate_consensus(self, responses: List[str], _results: List[Dict[str, Any]], on_token=None,
+                                   cancel_token: CancellationToken = None) -> str:
         """
         Use one final AI call to synthesize all agent responses into a coherent answer.
         """
+        with self.tracer.span("aggregate.consensus", responses=len(responses)) as span:
+            if len(responses) == 1:
+                if on_token:
+                    on_token(responses[0])
+                return responses[0]
+            
+            # Get the synthesized response, remembering what was already streamed
+            streamed = []
+            def relay(token):
+                streamed.append(token)
+                on_token(token)
+            
+            try:
+                return await self._synthesize(responses, relay if on_token else None, cancel_token)
+            except Exception as e:
+                # Log the error for debugging
+                print(f"\n🚨 SYNTHESIS FAILED: {str(e)}")
+                print("📋 Falling back to concatenated responses\n")
+                span.set(fallback=True, fallback_reason=str(e), fallback_after_tokens=len(streamed))
+                # Fallback: if synthesis fails, concatenate responses
+                fallback = self._concatenate(responses)
+                if streamed:
+                    # Part of the synthesis has been shown: say it was abandoned, so the stream and the
+                    # returned answer stay the same text
+                    fallback = SYNTHESIS_FAILED_MARKER + fallback
+                    on_token(fallback)
+                    return "".join(streamed) + fallback
+                if on_token:
+                    on_token(fallback)
+                return fallback
+    
+    async def _aggregate_tree(self, responses: List[str], results: List[Dict[str, Any]], on_token=None,
+                              cancel_token: CancellationToken = None) -> str:
+        """
+        Hierarchical map-reduce synthesis: responses are synthesized in groups of
+        synthesis_fan_in in parallel, then those intermediate answers are grouped
+        again, until one final consensus synthesis over at most fan_in inputs remains.
+        """
+        with self.tracer.span("aggregate.tree", responses=len(responses), fan_in=self.synthesis_fan_in) as span:
+            level = responses
+            levels = 0
+            while len(level) > self.synthesis_fan_in:
+                groups = [level[i:i + self.synthesis_fan_in] for i in range(0, len(level), self.synthesis_fan_in)]
+                level = list(await asyncio.gather(*(self._synthesize_group(group, cancel_token) for group in groups)))
+                levels += 1
+            span.set(levels=levels)
+            
+            return await self._aggregate_consensus(level, results, on_token, cancel_token)
+    
+    async def _synthesize_group(self, responses: List[str], cancel_token: CancellationToken = None) -> str:
+        """Intermediate synthesis for the tree strategy; keeps the raw responses if it fails"""
         if len(responses) == 1:
             return responses[0]
-        
-        # Create synthesis agent to combine all responses
-        synthesis_agent = OpenRouterAgent(silent=True)
+        try:
+            return await self._synthesize(responses, cancel_token=cancel_token)
+        except Exception:
+            return self._concatenate(responses)
+    
+    async def _synthesize(self, responses: List[str], on_token=None, cancel_token: CancellationToken = None) -> str:
+        """One synthesis LLM call over the given responses"""
+        # Create synthesis agent with no tools; one LLM call produces the answer
+        synthesis_agent = OpenRouterAgent(silent=True, runtime=self.runtime, tools=(), termination=SingleShotPolicy())
         
         # Build agent responses section
         agent_responses_text = ""
@@ -142,76 +297,148 @@ class TaskOrchestrator:
             agent_responses=agent_responses_text
         )
         
-        # Completely remove all tools from synthesis agent to force direct response
-        synthesis_agent.tools = []
-        synthesis_agent.tool_mapping = {}
+        return await synthesis_agent.run(synthesis_prompt, on_token=on_token, cancel_token=cancel_token)
+    
+    def _concatenate(self, responses: List[str]) -> str:
+        """Fallback when synthesis fails: concatenate responses"""
+        combined = []
+        for i, response in enumerate(responses, 1):
+            combined.append(f"=== Agent {i} Response ===")
+            combined.append(response)
+            combined.append("")
+        return "\n".join(combined)
+    
+    async def _collect_agent_results(self, task_to_agent: Dict[asyncio.Future, int],
+                                     cancel_tokens: List[CancellationToken],
+                                     state: OrchestrationState = None) -> List[Dict[str, Any]]:
+        """
+        Wait for agents until all have finished, the quorum of successful agents is
+        reached, the soft deadline has passed with at least min_agents successes,
+        or task_timeout expires. Agents cut off by the quorum or soft deadline are
+        cancelled cooperatively; results they deliver within late_result_grace are
+        still used. Anything left after that is cancelled outright.
+        """
+        num_tasks = len(task_to_agent)
+        quorum = min(self.quorum, num_tasks) if self.quorum > 0 else num_tasks
         
-        # Get the synthesized response
-        try:
-            final_answer = synthesis_agent.run(synthesis_prompt)
-            return final_answer
-        except Exception as e:
-            # Log the error for debugging
-            print(f"\n🚨 SYNTHESIS FAILED: {str(e)}")
-            print("📋 Falling back to concatenated responses\n")
-            # Fallback: if synthesis fails, concatenate responses
-            combined = []
-            for i, response in enumerate(responses, 1):
-                combined.append(f"=== Agent {i} Response ===")
-                combined.append(response)
-                combined.append("")
-            return "\n".join(combined)
-    
-    def get_progress_status(self) -> Dict[int, str]:
+        start = time.monotonic()
+        # Agents enforce their own deadlines; this is the backstop for any that overrun
+        deadlines = [token.deadline for token in cancel_tokens]
+        hard_deadline = max(deadlines) if None not in deadlines else float('inf')
+        soft_deadline = start + self.soft_deadline if self.soft_deadline else None
+        
+        results = {}
+        successes = 0
+        pending = set(task_to_agent)
+        
+        def collect(done):
+            nonlocal successes
+            for task in done:
+                result = self._task_result(task, task_to_agent[task])
+                results[result["agent_id"]] = result
+                if result["status"] == "success":
+                    successes += 1
+        
+        while pending:
+            now = time.monotonic()
+            if now >= hard_deadline or successes >= quorum:
+                break
+            if soft_deadline is not None and now >= soft_deadline and successes >= self.min_agents:
+                break
+            
+            wake_at = hard_deadline
+            if soft_deadline is not None and soft_deadline > now:
+                wake_at = min(wake_at, soft_deadline)
+            timeout = None if wake_at == float('inf') else wake_at - now
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            collect(done)
+        
+        timed_out = time.monotonic() >= hard_deadline
+        if pending and not timed_out:
+            # Ask the stragglers to stop at their next iteration and fold in anything that lands meanwhile
+            for task in pending:
+                cancel_tokens[task_to_agent[task]].cancel("enough agents finished")
+            grace = min(self.late_result_grace, hard_deadline - time.monotonic())
+            if grace > 0:
+                done, pending = await asyncio.wait(pending, timeout=grace)
+                collect(done)
+        
+        # Cancel whatever is still running
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for task in pending:
+            agent_id = task_to_agent[task]
+            status = "timeout" if timed_out else "cancelled"
+            self.update_agent_progress(agent_id, "FAILED: TIMEOUT" if timed_out else "CANCELLED", state=state)
+            results[agent_id] = {
+                "agent_id": agent_id,
+                "status": status,
+                "response": f"Agent {agent_id + 1} {'timed out' if timed_out else 'cancelled'}",
+                "execution_time": time.monotonic() - start
+            }
+        
+        return list(results.values())
+    
+    def _task_result(self, task: asyncio.Future, agent_id: int) -> Dict[str, Any]:
+        """Result dictionary for a finished agent task"""
+        if not task.cancelled() and task.exception() is None:
+            return task.result()
+        error = "was cancelled" if task.cancelled() else f"failed: {task.exception()}"
+        return {
+            "agent_id": agent_id,
+            "status": "error",
+            "response": f"Agent {agent_id + 1} {error}",
+            "execution_time": 0
+        }
+    
+    def get_progress_status(self, state: OrchestrationState = None) -> Dict[int, str]:
         """Get current progress status for all agents"""
-        with self.progress_lock:
-            return self.agent_progress.copy()
+        return (state or self.state).snapshot()
     
-    def orchestrate(self, user_input: str):
+    async def orchestrate(self, user_input: str, on_token=None, state: OrchestrationState = None):
         """
         Main orchestration method.
         Takes user input, delegates to parallel agents, and returns aggregated result.
+        Agents run as tasks on the current event loop rather than in OS threads.
+        If on_token is given, the final answer is streamed to it token by token.
+        Progress goes to state (a fresh OrchestrationState by default), so
+        concurrent orchestrations on one orchestrator never share it.
         """
         
-        # Reset progress tracking
-        self.agent_progress = {}
-        self.agent_results = {}
-        
-        # Decompose task into subtasks
-        subtasks = self.decompose_task(user_input, self.num_agents)
-        
-        # Initialize progress tracking
-        for i in range(self.num_agents):
-            self.agent_progress[i] = "QUEUED"
-        
-        # Execute agents in parallel
-        agent_results = []
+        # Fresh progress tracking for this orchestration
+        state = state or OrchestrationState()
+        self.state = state
         
-        with ThreadPoolExecutor(max_workers=self.num_agents) as executor:
-            # Submit all agent tasks
-            future_to_agent = {
-                executor.submit(self.run_agent_parallel, i, subtasks[i]): i 
+        with self.tracer.span("orchestrate", num_agents=self.num_agents, strategy=self.aggregation_strategy) as span:
+            # Deadline for the whole orchestration; every phase below is bounded by it
+            orchestration_token = CancellationToken.with_timeout(self.max_wall_time)
+            
+            # Decompose task into subtasks
+            subtasks = await self.decompose_task(user_input, self.num_agents, orchestration_token)
+            
+            # Initialize progress tracking
+            for i in range(self.num_agents):
+                state.update(i, "QUEUED")
+            
+            # Execute agents in parallel: one task per agent, each with its own cancellation token
+            cancel_tokens = [
+                CancellationToken.with_timeout(self.task_timeout, parent=orchestration_token)
+                for _ in range(self.num_agents)
+            ]
+            task_to_agent = {
+                asyncio.ensure_future(self.run_agent_parallel(i, subtasks[i], cancel_tokens[i], state)): i
                 for i in range(self.num_agents)
             }
             
-            # Collect results as they complete
-            for future in as_completed(future_to_agent, timeout=self.task_timeout):
-                try:
-                    result = future.result()
-                    agent_results.append(result)
-                except Exception as e:
-                    agent_id = future_to_agent[future]
-                    agent_results.append({
-                        "agent_id": agent_id,
-                        "status": "timeout",
-                        "response": f"Agent {agent_id + 1} timed out or failed: {str(e)}",
-                        "execution_time": self.task_timeout
-                    })
-        
-        # Sort results by agent_id for consistent output
-        agent_results.sort(key=lambda x: x["agent_id"])
-        
-        # Aggregate results
-        final_result = self.aggregate_results(agent_results)
-        
-        return final_result
\ No newline at end of file
+            agent_results = await self._collect_agent_results(task_to_agent, cancel_tokens, state)
+            
+            # Sort results by agent_id for consistent output
+            agent_results.sort(key=lambda x: x["agent_id"])
+            span.set(succeeded=sum(1 for result in agent_results if result["status"] == "success"))
+            
+            # Aggregate results
+            final_result = await self.aggregate_results(agent_results, on_token, orchestration_token)
+            
+            return final_result
\ No newline at end of file
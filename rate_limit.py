@@ -0,0 +1,249 @@
+import time
+import random
+import asyncio
+import threading
+import email.utils
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+# Status codes worth retrying; 429 and 503 also mean the provider wants less load
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+OVERLOAD_STATUS = (429, 503)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Delay requested by retry-after-ms / retry-after headers (seconds or HTTP date), if any"""
+    if headers is None:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """(retryable, overloaded, retry_after) for an exception raised by the OpenAI client"""
+    if openai is None:
+        return False, False, None
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        retry_after = retry_after_seconds(getattr(error.response, 'headers', None))
+        return status in RETRYABLE_STATUS or status >= 500, status in OVERLOAD_STATUS, retry_after
+    if isinstance(error, openai.APIConnectionError):
+        # Includes APITimeoutError
+        return True, False, None
+    return False, False, None
+
+
+class Reservation:
+    """What one acquire() took from the limiter, handed back to release()"""
+    __slots__ = ("tokens",)
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """
+    Process-wide gate in front of chat completion requests.
+
+    Requests wait until a concurrency slot, a requests-per-second token and
+    enough of the tokens-per-minute budget are free. The concurrency limit
+    adapts AIMD-style: it grows by about one slot per limit's worth of
+    successful requests and halves (at most once per decrease_cooldown) on
+    429/503 responses, whose Retry-After also pauses every caller. State is
+    guarded by a thread lock so one limiter serves every event loop. clock
+    (time.monotonic by default) is the time source for every deadline and refill.
+    """
+
+    def __init__(self, max_concurrency: int = 0, initial_concurrency: int = 32, min_concurrency: int = 1,
+                 requests_per_second: float = 0, tokens_per_minute: int = 0, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 30, decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min_concurrency)
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.clock = clock
+
+        self.limit = float(max(self.min_concurrency, initial_concurrency))
+        if max_concurrency:
+            self.limit = min(self.limit, max_concurrency)
+
+        self._lock = threading.Lock()
+        self._waiters = deque()  # (loop, future) of callers waiting for a slot
+        self._in_flight = 0
+        self._queued = 0
+        self._blocked_until = 0.0
+        self._last_decrease = float('-inf')
+
+        # Token buckets, refilled lazily
+        now = clock()
+        self._request_tokens = max(1.0, requests_per_second)
+        self._budget_tokens = float(tokens_per_minute)
+        self._refilled_at = now
+
+        self.counters = {"requests": 0, "succeeded": 0, "failed": 0, "overloaded": 0, "retries": 0}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateLimiter":
+        rate_config = config.get('rate_limit', {})
+        return cls(
+            max_concurrency=config.get('openrouter', {}).get('max_concurrent_requests', 0),
+            initial_concurrency=rate_config.get('initial_concurrency', 32),
+            min_concurrency=rate_config.get('min_concurrency', 1),
+            requests_per_second=rate_config.get('requests_per_second', 0),
+            tokens_per_minute=rate_config.get('tokens_per_minute', 0),
+            max_retries=rate_config.get('max_retries', 4),
+            backoff_base=rate_config.get('backoff_base', 0.5),
+            backoff_max=rate_config.get('backoff_max', 30)
+        )
+
+    @property
+    def concurrency_limit(self) -> int:
+        limit = max(self.min_concurrency, int(self.limit))
+        return min(limit, self.max_concurrency) if self.max_concurrency else limit
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if self.requests_per_second:
+            self._request_tokens = min(max(1.0, self.requests_per_second),
+                                       self._request_tokens + elapsed * self.requests_per_second)
+        if self.tokens_per_minute:
+            self._budget_tokens = min(float(self.tokens_per_minute),
+                                      self._budget_tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _try_reserve(self, tokens: int, now: float) -> float:
+        """Take a slot and return 0, or return how long to wait (inf: until a slot is released)"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= self.concurrency_limit:
+            return float('inf')
+
+        self._refill(now)
+        if self.requests_per_second and self._request_tokens < 1:
+            return (1 - self._request_tokens) / self.requests_per_second
+        needed = min(tokens, self.tokens_per_minute)
+        if self.tokens_per_minute and self._budget_tokens < needed:
+            return (needed - self._budget_tokens) * 60 / self.tokens_per_minute
+
+        self._in_flight += 1
+        if self.requests_per_second:
+            self._request_tokens -= 1
+        if self.tokens_per_minute:
+            self._budget_tokens -= needed
+        self.counters["requests"] += 1
+        return 0.0
+
+    async def acquire(self, tokens: int = 0) -> Reservation:
+        """Wait until a request estimated at `tokens` prompt tokens may be sent"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._queued += 1
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_reserve(tokens, self.clock())
+                    if delay == 0:
+                        return Reservation(min(tokens, self.tokens_per_minute))
+                    future = loop.create_future()
+                    if len(self._waiters) > 2 * self._queued:
+                        # Drop waiters that already gave up (timed out or cancelled)
+                        self._waiters = deque(waiter for waiter in self._waiters if not waiter[1].done())
+                    self._waiters.append((loop, future))
+                try:
+                    await asyncio.wait_for(future, None if delay == float('inf') else delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+    def release(self, reservation: Reservation, succeeded: bool = True, overloaded: bool = False,
+                retry_after: float = None, tokens_used: int = None):
+        """Return a slot, settle the token budget and adapt the concurrency limit"""
+        now = self.clock()
+        with self._lock:
+            self._in_flight -= 1
+            if self.tokens_per_minute and tokens_used is not None:
+                # Charge what the request really used instead of the estimate
+                self._budget_tokens += reservation.tokens - tokens_used
+
+            if succeeded:
+                self.counters["succeeded"] += 1
+                self.limit += 1.0 / max(1.0, self.limit)
+                if self.max_concurrency:
+                    self.limit = min(self.limit, float(self.max_concurrency))
+            else:
+                self.counters["failed"] += 1
+
+            if overloaded:
+                self.counters["overloaded"] += 1
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self._last_decrease = now
+                    self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+
+            waiters = list(self._waiters)
+            self._waiters.clear()
+
+        # Waiters may belong to other event loops; each re-checks the limits when woken
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # Its loop has been closed
+                pass
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number attempt + 1"""
+        with self._lock:
+            self.counters["retries"] += 1
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limits, queue depth and counters"""
+        now = self.clock()
+        with self._lock:
+            self._refill(now)
+            return {
+                "concurrency_limit": self.concurrency_limit,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "requests_per_second": self.requests_per_second,
+                "tokens_per_minute": self.tokens_per_minute,
+                "tokens_available": round(self._budget_tokens) if self.tokens_per_minute else None,
+                "blocked_for": round(max(0.0, self._blocked_until - now), 3),
+                **self.counters
+            }
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
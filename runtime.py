@@ -0,0 +1,163 @@
+import os
+import asyncio
+import weakref
+import functools
+import threading
+import contextvars
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+from openai import AsyncOpenAI
+from tools import discover_tools
+from tools.base_tool import BaseTool
+from singleflight import SingleFlight
+from tracing import tracer_from_config
+from rate_limit import RateLimiter
+from hedging import Hedger
+from context_budget import ContextStats
+
+class ToolRegistry:
+    """Frozen set of discovered tools with precomputed OpenRouter schemas"""
+
+    def __init__(self, tools: Dict[str, BaseTool]):
+        self._tools = dict(tools)
+        # Schemas never change after discovery, so build them once
+        self._schemas = {name: tool.to_openrouter_schema() for name, tool in self._tools.items()}
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def get(self, name: str) -> Optional[BaseTool]:
+        return self._tools.get(name)
+
+    def select(self, include: Iterable[str] = None, exclude: Iterable[str] = ()) -> Tuple[str, ...]:
+        """Resolve a tool subset, keeping discovery order"""
+        exclude = set(exclude or ())
+        if include is None:
+            return tuple(name for name in self._tools if name not in exclude)
+
+        include = set(include)
+        return tuple(name for name in self._tools if name in include and name not in exclude)
+
+    def schemas(self, names: Iterable[str]) -> List[Dict[str, Any]]:
+        """OpenRouter tools array for the given tool names"""
+        return [self._schemas[name] for name in names]
+
+    def tools(self, names: Iterable[str]) -> Dict[str, BaseTool]:
+        return {name: self._tools[name] for name in names}
+
+
+class AgentRuntime:
+    """
+    Process-level state shared by every agent built from the same config:
+    the parsed config, pooled OpenAI clients, the tool registry, the
+    executor that blocking tools run on and the tracer.
+    """
+
+    def __init__(self, config_path="config.yaml", silent=False):
+        # Load configuration
+        with open(config_path, 'r') as f:
+            self.config = yaml.safe_load(f)
+
+        self.config_path = config_path
+
+        # Async clients are bound to the event loop that created their connection pool
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._clients_lock = threading.Lock()
+
+        # Process-wide adaptive limiter (concurrency, RPS, TPM) in front of every LLM request
+        self.rate_limiter = RateLimiter.from_config(self.config)
+
+        # Duplicates LLM requests that run past the recent latency percentile (off unless enabled)
+        self.hedger = Hedger.from_config(self.config)
+
+        # Blocking tools run here so agent loops never need a thread of their own
+        tool_workers = self.config.get('agent', {}).get('tool_workers', 16)
+        self.tool_executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="tool")
+
+        # Identical idempotent tool calls from concurrent agents share one execution
+        self.single_flight = SingleFlight()
+
+        # Context compaction totals of every agent, including the orchestrator's short-lived sub-agents
+        self.context_stats = ContextStats()
+
+        # Span tracing of LLM calls, tool calls and orchestration phases (no-op unless enabled)
+        self.tracer = tracer_from_config(self.config)
+
+        # Discover tools once and freeze them
+        self.registry = ToolRegistry(discover_tools(self.config, silent=silent))
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Pooled AsyncOpenAI client for the running event loop (closed by close_loop)"""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                # Retries are done by the agent through the rate limiter, which needs to see every 429
+                client = AsyncOpenAI(
+                    base_url=self.config['openrouter']['base_url'],
+                    api_key=self.config['openrouter']['api_key'],
+                    max_retries=0
+                )
+                self._async_clients[loop] = client
+            return client
+
+    def close_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Shut down an event loop that ran a whole session (see main.py): cancel
+        whatever is still running on it, close its pooled client and close it.
+        """
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        with self._clients_lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            loop.run_until_complete(client.close())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking callable on the shared tool executor, carrying over context variables"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.tool_executor, context.run, functools.partial(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Runtime-wide counters shared by every agent"""
+        tool_stats = {}
+        for name, tool in self.registry.tools(self.registry.names).items():
+            stats = tool.stats()
+            if stats is not None:
+                tool_stats[name] = stats
+        return {
+            "single_flight": self.single_flight.stats(),
+            "rate_limit": self.rate_limiter.stats(),
+            "hedging": self.hedger.stats(),
+            "context": self.context_stats.stats(),
+            "tools": tool_stats
+        }
+
+
+_runtimes: Dict[str, AgentRuntime] = {}
+_runtimes_lock = threading.Lock()
+
+def get_runtime(config_path="config.yaml", silent=False) -> AgentRuntime:
+    """Return the shared runtime for a config file, creating it on first use"""
+    key = os.path.abspath(config_path)
+    with _runtimes_lock:
+        runtime = _runtimes.get(key)
+        if runtime is None:
+            runtime = AgentRuntime(config_path, silent=silent)
+            _runtimes[key] = runtime
+        return runtime
@@ -0,0 +1,241 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Tuple
+from orchestrator import TaskOrchestrator, OrchestrationState
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 503: "Service Unavailable"}
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class OrchestrationServer:
+    """
+    Long-lived HTTP service around one warm TaskOrchestrator.
+
+    POST /orchestrate  {"query": "..."} streams Server-Sent Events:
+                       "progress" (per-agent status), "token" (final answer text),
+                       then "result" or "error". With "stream": false a single
+                       JSON response is returned instead.
+    GET  /healthz      liveness and current load
+    GET  /metrics      request counters plus runtime statistics
+    """
+
+    # Largest request body accepted
+    MAX_BODY_BYTES = 1024 * 1024
+
+    def __init__(self, config_path="config.yaml"):
+        # Config, tools and connection pools are loaded once and shared by every request
+        self.orchestrator = TaskOrchestrator(config_path, silent=True)
+        server_config = self.orchestrator.config.get('server', {})
+        self.host = server_config.get('host', '127.0.0.1')
+        self.port = server_config.get('port', 8000)
+        self.max_concurrent = server_config.get('max_concurrent_orchestrations', 0)
+        self.reuse_port = server_config.get('reuse_port', False)
+
+        self.active = 0
+        self.started_at = time.time()
+        self.metrics = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0, "disconnected": 0,
+                        "orchestration_seconds": 0.0}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one request per connection"""
+        try:
+            method, path, body = await self._read_request(reader)
+            self.metrics["requests"] += 1
+
+            if path == "/healthz" and method == "GET":
+                await self._send_json(writer, 200, {"status": "ok", "active": self.active})
+            elif path == "/metrics" and method == "GET":
+                await self._send_json(writer, 200, self.get_metrics())
+            elif path == "/orchestrate" and method == "POST":
+                await self.handle_orchestrate(body, writer)
+            elif path in ("/healthz", "/metrics", "/orchestrate"):
+                await self._send_json(writer, 405, {"error": f"{method} not allowed on {path}"})
+            else:
+                await self._send_json(writer, 404, {"error": f"Unknown path: {path}"})
+        except _BadRequest as e:
+            await self._send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_orchestrate(self, body: bytes, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(body or b"{}")
+            query = request["query"].strip()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise _BadRequest(400, 'Body must be JSON with a non-empty "query" string')
+        if not query:
+            raise _BadRequest(400, 'Body must be JSON with a non-empty "query" string')
+
+        # Shed load instead of queueing so a load balancer can try another worker
+        if self.max_concurrent and self.active >= self.max_concurrent:
+            self.metrics["rejected"] += 1
+            await self._send_json(writer, 503, {"error": "Server busy"}, {"Retry-After": "1"})
+            return
+
+        self.active += 1
+        start_time = time.time()
+        try:
+            if request.get("stream", True):
+                ok = await self._orchestrate_stream(query, writer)
+            else:
+                ok = await self._orchestrate_json(query, writer)
+            self.metrics["completed" if ok else "failed"] += 1
+        finally:
+            self.active -= 1
+            self.metrics["orchestration_seconds"] += time.time() - start_time
+
+    async def _orchestrate_json(self, query: str, writer: asyncio.StreamWriter) -> bool:
+        state = OrchestrationState()
+        start_time = time.time()
+        try:
+            answer = await self.orchestrator.orchestrate(query, state=state)
+        except Exception as e:
+            await self._send_json(writer, 200, {"status": "error", "error": str(e)})
+            return False
+        await self._send_json(writer, 200, {
+            "status": "success",
+            "answer": answer,
+            "agents": state.snapshot(),
+            "elapsed": round(time.time() - start_time, 3)
+        })
+        return True
+
+    async def _orchestrate_stream(self, query: str, writer: asyncio.StreamWriter) -> bool:
+        """Run one orchestration and relay its progress and answer as Server-Sent Events"""
+        events = asyncio.Queue()
+        done = object()
+        state = OrchestrationState(
+            on_progress=lambda agent_id, status: events.put_nowait(
+                ("progress", {"agent_id": agent_id, "status": status, "agents": state.snapshot()})
+            )
+        )
+
+        start_time = time.time()
+        task = asyncio.ensure_future(self.orchestrator.orchestrate(
+            query, on_token=lambda token: events.put_nowait(("token", {"text": token})), state=state
+        ))
+        task.add_done_callback(lambda _: events.put_nowait(done))
+
+        try:
+            writer.write(self._head(200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}))
+            while True:
+                event = await events.get()
+                if event is done:
+                    break
+                await self._send_event(writer, *event)
+
+            try:
+                answer = task.result()
+            except Exception as e:
+                await self._send_event(writer, "error", {"error": str(e)})
+                return False
+            await self._send_event(writer, "result", {
+                "answer": answer,
+                "agents": state.snapshot(),
+                "elapsed": round(time.time() - start_time, 3)
+            })
+            return True
+        except ConnectionError:
+            # Client went away: stop spending tokens on its query
+            self.metrics["disconnected"] += 1
+            return False
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "uptime": round(time.time() - self.started_at, 3),
+            "active": self.active,
+            **self.metrics,
+            "runtime": self.orchestrator.runtime.stats()
+        }
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise _BadRequest(413, "Request headers too large")
+
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise _BadRequest(400, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise _BadRequest(400, "Invalid Content-Length")
+        if length > self.MAX_BODY_BYTES:
+            raise _BadRequest(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], body
+
+    def _head(self, status: int, headers: Dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Connection: close"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any],
+                         headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode()
+        writer.write(self._head(status, {"Content-Type": "application/json", "Content-Length": str(len(data)),
+                                         **(headers or {})}))
+        writer.write(data)
+        await writer.drain()
+
+    async def _send_event(self, writer: asyncio.StreamWriter, event: str, payload: Dict[str, Any]):
+        writer.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode())
+        await writer.drain()
+
+    async def serve(self):
+        # With reuse_port several worker processes can listen on the same port
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                            reuse_port=self.reuse_port or None)
+        print(f"Serving on http://{self.host}:{self.port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Entry point for the HTTP service"""
+    parser = argparse.ArgumentParser(description="Serve orchestrations over HTTP with Server-Sent Events")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--host", help="Overrides server.host")
+    parser.add_argument("--port", type=int, help="Overrides server.port")
+    parser.add_argument("--reuse-port", action="store_true", help="Let several worker processes share the port")
+    args = parser.parse_args()
+
+    server = OrchestrationServer(args.config)
+    if args.host:
+        server.host = args.host
+    if args.port is not None:
+        server.port = args.port
+    if args.reuse_port:
+        server.reuse_port = True
+
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
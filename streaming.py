@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+@dataclass
+class StreamedFunction:
+    name: str = ""
+    arguments: str = ""
+
+
+@dataclass
+class StreamedToolCall:
+    id: str = ""
+    type: str = "function"
+    function: StreamedFunction = field(default_factory=StreamedFunction)
+
+
+@dataclass
+class StreamedMessage:
+    role: str = "assistant"
+    content: Optional[str] = None
+    tool_calls: Optional[List[StreamedToolCall]] = None
+
+
+@dataclass
+class StreamedChoice:
+    message: StreamedMessage
+    index: int = 0
+    finish_reason: Optional[str] = None
+
+
+@dataclass
+class StreamedResponse:
+    """Same shape as a non-streamed completion, as far as the agent loop reads it"""
+    choices: List[StreamedChoice]
+    usage: Any = None
+
+
+class StreamAccumulator:
+    """Assemble streamed chat completion chunks into a single response"""
+
+    def __init__(self, on_token: Callable[[str], None] = None):
+        self.on_token = on_token
+        self.usage = None
+        self.finish_reason = None
+        self._content: List[str] = []
+        self._tool_calls: Dict[int, StreamedToolCall] = {}
+
+    def add(self, chunk):
+        """Fold one chunk into the response, forwarding content deltas to on_token"""
+        if getattr(chunk, 'usage', None):
+            self.usage = chunk.usage
+
+        for choice in chunk.choices or []:
+            if choice.index != 0:
+                continue
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+
+            delta = choice.delta
+            if delta is None:
+                continue
+
+            if delta.content:
+                self._content.append(delta.content)
+                if self.on_token:
+                    self.on_token(delta.content)
+
+            # Tool calls arrive as fragments keyed by index; names and arguments are concatenated
+            for tool_call_delta in delta.tool_calls or []:
+                tool_call = self._tool_calls.setdefault(tool_call_delta.index, StreamedToolCall())
+                if tool_call_delta.id:
+                    tool_call.id = tool_call_delta.id
+                if tool_call_delta.function is not None:
+                    if tool_call_delta.function.name:
+                        tool_call.function.name += tool_call_delta.function.name
+                    if tool_call_delta.function.arguments:
+                        tool_call.function.arguments += tool_call_delta.function.arguments
+
+    def response(self) -> StreamedResponse:
+        tool_calls = [self._tool_calls[index] for index in sorted(self._tool_calls)]
+        message = StreamedMessage(
+            content="".join(self._content) if self._content else None,
+            tool_calls=tool_calls or None
+        )
+        return StreamedResponse(
+            choices=[StreamedChoice(message=message, finish_reason=self.finish_reason)],
+            usage=self.usage
+        )
@@ -0,0 +1,45 @@
+from typing import Any, Callable, Optional
+
+class TerminationPolicy:
+    """
+    Decides when the agent loop stops.
+    should_stop is checked after every LLM response, before its tool calls run;
+    a call to completion_tool (if set) ends the loop once that tool has run.
+    """
+    
+    completion_tool: Optional[str] = None
+    
+    def should_stop(self, assistant_message: Any, iteration: int) -> bool:
+        return False
+
+
+class CompletionToolPolicy(TerminationPolicy):
+    """Stop when the model calls the task completion tool (the default)"""
+    
+    def __init__(self, tool_name: str = "mark_task_complete"):
+        self.completion_tool = tool_name
+
+
+class SingleShotPolicy(TerminationPolicy):
+    """Stop after the first LLM response; its tool calls are not executed"""
+    
+    def should_stop(self, assistant_message: Any, iteration: int) -> bool:
+        return True
+
+
+class StopOnPlainAnswerPolicy(TerminationPolicy):
+    """Stop as soon as the model answers without calling any tools"""
+    
+    def should_stop(self, assistant_message: Any, iteration: int) -> bool:
+        return not assistant_message.tool_calls
+
+
+class PredicatePolicy(TerminationPolicy):
+    """Stop when predicate(assistant_message, iteration) returns True"""
+    
+    def __init__(self, predicate: Callable[[Any, int], bool], completion_tool: Optional[str] = None):
+        self.predicate = predicate
+        self.completion_tool = completion_tool
+    
+    def should_stop(self, assistant_message: Any, iteration: int) -> bool:
+        return bool(self.predicate(assistant_message, iteration))
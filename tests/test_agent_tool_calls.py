@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent import OpenRouterAgent
+from cancellation import CancellationToken
+from tools.base_tool import BaseTool
+
+
+class DeadlineProbeTool(BaseTool):
+    """Idempotent tool that reports the deadline it was run under"""
+
+    name = "probe"
+    description = "Report remaining time"
+    parameters = {"type": "object", "properties": {}}
+    idempotent = True
+
+    def execute(self) -> dict:
+        time.sleep(0.3)
+        return {"remaining_seen": self.remaining_time()}
+
+
+def tool_call(call_id: str):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name="probe", arguments="{}"))
+
+
+class CoalescedDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        with open(os.path.join(ROOT, "config.yaml"), encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        config["tools"]["manifest_path"] = os.path.join(self.directory.name, "manifest.json")
+        config["cache"]["enabled"] = False
+        config_path = os.path.join(self.directory.name, "config.yaml")
+        with open(config_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(config, f)
+
+        self.agent = OpenRouterAgent(config_path, silent=True)
+        probe = DeadlineProbeTool()
+        self.agent.discovered_tools = {**self.agent.discovered_tools, "probe": probe}
+        self.agent.tool_mapping = {**self.agent.tool_mapping, "probe": probe.execute}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_waiter_with_longer_deadline_is_not_shortened(self):
+        async def run():
+            short = self.agent.ahandle_tool_call(tool_call("short"), CancellationToken.with_timeout(0.2))
+            long = self.agent.ahandle_tool_call(tool_call("long"), CancellationToken.with_timeout(30))
+            return await asyncio.gather(short, long)
+
+        before = self.agent.runtime.single_flight.stats()
+        short, long = asyncio.run(run())
+        after = self.agent.runtime.single_flight.stats()
+
+        # One shared execution...
+        self.assertEqual(after["calls"] - before["calls"], 1)
+        self.assertEqual(after["coalesced"] - before["coalesced"], 1)
+        # ...that the short caller stops waiting for at its own deadline
+        self.assertIn("did not finish before the agent's deadline", short["content"])
+        # and that did not run under the short caller's deadline
+        self.assertEqual(long["content"], '{"remaining_seen": null}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import read_queries
+
+
+class ReadQueriesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self, filename, text):
+        path = os.path.join(self.directory.name, filename)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return list(read_queries(path))
+
+    def test_jsonl_lines_without_a_query_are_errors(self):
+        items = self.read("q.jsonl", '{"id": "a", "query": "hi"}\n\n"plain"\n{"id": "c", "query": " "}\nnot json\n')
+        self.assertEqual(items[0], {"id": "a", "query": "hi"})
+        self.assertEqual(items[1], {"id": "3", "query": "plain"})
+        self.assertEqual((items[2]["id"], items[2]["line"]), ("c", 4))
+        self.assertIn("error", items[2])
+        self.assertEqual((items[3]["id"], items[3]["line"]), ("5", 5))
+        self.assertTrue(items[3]["error"].startswith("Invalid JSON"))
+
+    def test_csv_rows_without_a_query_are_errors(self):
+        items = self.read("q.csv", 'id,query\r\na,hello\r\nb,\r\n,  \r\nd,"two\r\nlines"\r\n')
+        self.assertEqual(items[0], {"id": "a", "query": "hello"})
+        # Reported like a JSONL line without a query instead of being dropped
+        self.assertEqual((items[1]["id"], items[1]["line"]), ("b", 3))
+        self.assertIn("error", items[1])
+        self.assertEqual((items[2]["id"], items[2]["line"]), ("3", 4))
+        self.assertIn("error", items[2])
+        self.assertEqual(items[3], {"id": "d", "query": "two\r\nlines"})
+        self.assertEqual(len(items), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
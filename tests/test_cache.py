@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.cache import TieredCache
+
+# Every test value serializes to ENTRY bytes
+ENTRY = len(json.dumps("x" * 10))
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "search_cache.sqlite")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cache(self, path="default", **kwargs) -> TieredCache:
+        cache = TieredCache(self.path if path == "default" else path, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def value(self, name: str) -> str:
+        return name * 10
+
+    def counters(self, cache: TieredCache, namespace: str = "query") -> dict:
+        return cache.stats()["namespaces"].get(namespace, {})
+
+    def disk_keys(self, cache: TieredCache) -> set:
+        return {key for (key,) in cache._db.execute("SELECT key FROM entries")}
+
+
+class MemoryTierTest(CacheTestCase):
+    def test_lru_evicts_the_least_recently_used_entry(self):
+        cache = self.cache(path=None, memory_max_bytes=2 * ENTRY)
+        cache.set("query", "a", self.value("a"), ttl=60)
+        cache.set("query", "b", self.value("b"), ttl=60)
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+        cache.set("query", "c", self.value("c"), ttl=60)
+
+        self.assertIsNone(cache.get("query", "b"))
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+        self.assertEqual(cache.get("query", "c"), self.value("c"))
+        counters = self.counters(cache)
+        self.assertEqual((counters["memory_evictions"], counters["memory_hits"], counters["misses"]), (1, 3, 1))
+        self.assertEqual(cache.stats()["memory_bytes"], 2 * ENTRY)
+
+    def test_overwrite_replaces_the_size(self):
+        cache = self.cache(path=None)
+        cache.set("query", "a", "short", ttl=60)
+        cache.set("query", "a", self.value("a"), ttl=60)
+        self.assertEqual(cache.stats()["memory_entries"], 1)
+        self.assertEqual(cache.stats()["memory_bytes"], ENTRY)
+
+    def test_unopenable_store_falls_back_to_memory(self):
+        blocker = os.path.join(self.directory.name, "file")
+        open(blocker, "w").close()
+        cache = self.cache(path=os.path.join(blocker, "cache.sqlite"))
+        self.assertIsNone(cache.stats()["path"])
+        cache.set("query", "a", self.value("a"), ttl=60)
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+
+
+class TieringTest(CacheTestCase):
+    def test_disk_hit_is_promoted_to_memory(self):
+        cache = self.cache(memory_max_bytes=ENTRY)
+        cache.set("query", "a", self.value("a"), ttl=60)
+        cache.set("query", "b", self.value("b"), ttl=60)  # pushes a out of memory
+
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+        self.assertEqual(self.counters(cache)["disk_hits"], 1)
+        # Now served from memory, and b was pushed out in its place
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+        self.assertEqual(cache.get("query", "b"), self.value("b"))
+        counters = self.counters(cache)
+        self.assertEqual((counters["memory_hits"], counters["disk_hits"], counters["memory_evictions"]), (1, 2, 3))
+
+    def test_entry_too_large_for_memory_is_kept_on_disk(self):
+        cache = self.cache(memory_max_bytes=ENTRY - 1)
+        cache.set("query", "a", self.value("a"), ttl=60)
+        self.assertEqual(cache.stats()["memory_entries"], 0)
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+        self.assertEqual(self.counters(cache)["disk_hits"], 1)
+
+    def test_namespaces_are_separate(self):
+        cache = self.cache()
+        cache.set("query", "k", self.value("q"), ttl=60)
+        cache.set("page_text", "k", self.value("p"), ttl=60)
+        self.assertEqual(cache.get("query", "k"), self.value("q"))
+        self.assertEqual(cache.get("page_text", "k"), self.value("p"))
+        self.assertEqual(set(cache.stats()["namespaces"]), {"query", "page_text"})
+
+    def test_disk_evicts_least_recently_accessed_rows(self):
+        cache = self.cache(memory_max_bytes=0, disk_max_bytes=3 * ENTRY)
+        cache.EVICT_INTERVAL = 1
+        for name in "abc":
+            cache.set("query", name, self.value(name), ttl=60)
+            self.clock.advance(1)
+        # Reading a refreshes its access time, so b is now the oldest
+        self.assertEqual(cache.get("query", "a"), self.value("a"))
+        self.clock.advance(1)
+
+        cache.set("query", "d", self.value("d"), ttl=60)
+        self.assertEqual(self.disk_keys(cache), {"a", "c", "d"})
+        self.assertEqual(self.counters(cache)["disk_evictions"], 1)
+
+    def test_size_check_runs_every_evict_interval_writes(self):
+        cache = self.cache(memory_max_bytes=0, disk_max_bytes=ENTRY)
+        cache.EVICT_INTERVAL = 3
+        for name in "ab":
+            cache.set("query", name, self.value(name), ttl=60)
+            self.clock.advance(1)
+        self.assertEqual(self.disk_keys(cache), {"a", "b"})
+        cache.set("query", "c", self.value("c"), ttl=60)
+        self.assertEqual(self.disk_keys(cache), {"c"})
+
+
+class ExpiryTest(CacheTestCase):
+    def test_entries_expire_in_both_tiers(self):
+        cache = self.cache(memory_max_bytes=ENTRY)
+        cache.set("query", "a", self.value("a"), ttl=10)
+        cache.set("query", "b", self.value("b"), ttl=100)  # a now only on disk
+        self.clock.advance(10)
+
+        self.assertIsNone(cache.get("query", "a"))
+        self.assertNotIn("a", self.disk_keys(cache))
+        self.assertEqual(cache.get("query", "b"), self.value("b"))
+
+        self.clock.advance(90)
+        self.assertIsNone(cache.get("query", "b"))
+        self.assertEqual(cache.stats()["memory_entries"], 0)
+        counters = self.counters(cache)
+        self.assertEqual((counters["expired"], counters["misses"]), (2, 2))
+
+    def test_eviction_pass_drops_expired_rows_first(self):
+        cache = self.cache(memory_max_bytes=0)
+        cache.EVICT_INTERVAL = 2
+        cache.set("query", "old", self.value("o"), ttl=5)
+        self.clock.advance(5)
+        cache.set("query", "new", self.value("n"), ttl=5)
+        self.assertEqual(self.disk_keys(cache), {"new"})
+        self.assertNotIn("disk_evictions", self.counters(cache))
+
+
+class ReopenTest(CacheTestCase):
+    def test_entries_survive_reopening_the_wal_store(self):
+        cache = self.cache()
+        cache.set("query", "a", {"results": [1, 2]}, ttl=60)
+        cache.set("page_text", "url", "text", ttl=60)
+        self.assertEqual(cache._db.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        cache.close()
+        self.assertIsNone(cache.stats()["path"])
+
+        reopened = self.cache()
+        self.assertEqual(reopened._db.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(reopened.get("query", "a"), {"results": [1, 2]})
+        self.assertEqual(reopened.get("page_text", "url"), "text")
+        self.assertEqual(self.counters(reopened)["disk_hits"], 1)
+
+        # Expiry is stored with the row, not reset by reopening
+        reopened.close()
+        self.clock.advance(60)
+        self.assertIsNone(self.cache().get("query", "a"))
+
+    def test_open_connections_share_writes(self):
+        writer = self.cache()
+        reader = self.cache()
+        self.assertIsNone(reader.get("query", "a"))
+        writer.set("query", "a", self.value("a"), ttl=60)
+        self.assertEqual(reader.get("query", "a"), self.value("a"))
+
+    def test_reopening_keeps_rows_of_an_existing_file(self):
+        self.cache().set("query", "a", self.value("a"), ttl=60)
+        # Another process may already have created the table and index
+        db = sqlite3.connect(self.path)
+        self.assertEqual(db.execute("SELECT COUNT(*) FROM entries").fetchone()[0], 1)
+        db.close()
+        self.assertEqual(self.cache().get("query", "a"), self.value("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
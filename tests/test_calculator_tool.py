@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.calculator_tool import CalculatorTool, np
+
+
+def calculator(use_numpy: bool) -> CalculatorTool:
+    return CalculatorTool({'calculator': {'use_numpy': use_numpy, 'isolate': False}})
+
+
+class MultiArgumentSumTest(unittest.TestCase):
+    def check_sum(self, tool: CalculatorTool):
+        result = tool.execute(expressions=['sum(x, y)', 'sum(x, y, 1)', 'sum(x)', 'sum(1, 2)'],
+                              variables={'x': [1, 2, 3], 'y': [10, 20, 30]})
+        self.assertTrue(result["success"], result)
+        self.assertEqual([item["result"] for item in result["results"]], [[11, 22, 33], [12, 23, 34], 6, 3])
+        self.assertEqual(tool.execute(expression='sum(1, 2, 3)')["result"], 6)
+
+    def test_sum_without_numpy(self):
+        self.check_sum(calculator(use_numpy=False))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_sum_with_numpy(self):
+        self.check_sum(calculator(use_numpy=True))
+
+
+class CostLimitTest(unittest.TestCase):
+    def setUp(self):
+        self.tool = calculator(use_numpy=False)
+
+    def test_negative_exponent_is_cheap(self):
+        result = self.tool.execute(expression='2**-5000')
+        self.assertTrue(result["success"], result)
+        self.assertEqual(result["result"], 0.0)
+        self.assertTrue(self.tool.execute(expression='x**-20000', variables={'x': 3})["success"])
+
+    def test_tower_of_powers_is_rejected(self):
+        result = self.tool.execute(expression='9**9**9')
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error_type"], "too_expensive")
+
+    def test_large_positive_exponent_is_rejected(self):
+        result = self.tool.execute(expression='x**1000000', variables={'x': 3})
+        self.assertEqual(result["error_type"], "too_expensive")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_budget import ContextBudget, ContextStats
+
+
+def history(result_chars: int):
+    return [
+        {"role": "system", "content": "You are helpful."},
+        {"role": "user", "content": "Question"},
+        {"role": "assistant", "content": None, "tool_calls": []},
+        {"role": "tool", "name": "read_file", "content": "x" * result_chars},
+        {"role": "assistant", "content": "Thinking", "tool_calls": []},
+        {"role": "tool", "name": "search_web", "content": "y" * result_chars},
+    ]
+
+
+class ContextStatsTest(unittest.TestCase):
+    def test_fit_reports_last_fit_and_shared_totals(self):
+        stats = ContextStats()
+        budget = ContextBudget(tool_result_max_tokens=100, keep_consumed_turns=0, stats=stats)
+        budget._encoding = None
+
+        messages = history(4000)
+        after = budget.fit(messages)
+
+        fit = budget.last_fit
+        self.assertEqual(fit["prompt_tokens_after"], after)
+        self.assertGreater(fit["tokens_saved"], 0)
+        self.assertEqual(fit["elided"], 1)
+        self.assertEqual(fit["truncated"], 1)
+        self.assertFalse(fit["over_budget"])
+
+        # A second agent's budget feeds the same totals
+        other = ContextBudget(tool_result_max_tokens=100, keep_consumed_turns=0, stats=stats)
+        other._encoding = None
+        other.fit(history(4000))
+        totals = stats.stats()
+        self.assertEqual(totals["fits"], 2)
+        self.assertEqual(totals["tokens_saved"], 2 * fit["tokens_saved"])
+        self.assertGreater(totals["reduction"], 0.5)
+
+    def test_fit_without_changes_saves_nothing(self):
+        budget = ContextBudget(stats=ContextStats())
+        budget.fit(history(10))
+        self.assertEqual(budget.last_fit["tokens_saved"], 0)
+        self.assertEqual(budget.stats.stats()["fits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import tempfile
+import textwrap
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import discover_tools
+from tools.discovery import MANIFEST_VERSION
+
+HELPER_SOURCE = """
+from tools.base_tool import BaseTool
+
+class HelperBase(BaseTool):
+    # Abstract: a shared base for tools, not a tool itself
+    pass
+
+def shout(text):
+    return text.upper()
+"""
+
+TOOL_SOURCE = """
+from tools.base_tool import BaseTool
+from {helper} import shout
+
+class {cls}(BaseTool):
+    name = "{name}"
+    description = "Echoes its input"
+    parameters = {{"type": "object", "properties": {{"text": {{"type": "string"}}}}}}
+
+    def __init__(self, config):
+        self.config = config
+
+    def execute(self, text=""):
+        return {{"echo": shout(text)}}
+"""
+
+
+class DiscoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.manifest_path = os.path.join(self.directory.name, "manifest.json")
+        self.first = self.make_dir("first", "EchoTool", "echo")
+        self.second = self.make_dir("second", "ShoutTool", "shout")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_dir(self, subdir, cls, name):
+        directory = os.path.join(self.directory.name, subdir)
+        os.makedirs(directory)
+        helper = f"helpers_{subdir}"
+        with open(os.path.join(directory, f"{helper}.py"), "w") as f:
+            f.write(HELPER_SOURCE)
+        with open(os.path.join(directory, f"{name}_tool.py"), "w") as f:
+            f.write(textwrap.dedent(TOOL_SOURCE.format(helper=helper, cls=cls, name=name)))
+        sys.path.insert(0, directory)
+        self.addCleanup(sys.path.remove, directory)
+        return directory
+
+    def config(self, *extra_dirs):
+        return {"tools": {"extra_dirs": list(extra_dirs), "entry_points": False, "manifest_path": self.manifest_path}}
+
+    def manifest(self):
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_helper_modules_are_recorded_without_tools(self):
+        tools = discover_tools(self.config(self.first), silent=True)
+        self.assertIn("echo", tools)
+        self.assertNotIn("HelperBase", tools)
+
+        manifest = self.manifest()
+        self.assertEqual(manifest["version"], MANIFEST_VERSION)
+        sources = manifest["sources"]
+        # Support modules in tools/ are sources with no tools, not failed imports
+        self.assertEqual(sources["tools.atomic"]["tools"], [])
+        self.assertEqual(sources["tools.base_tool"]["tools"], [])
+        self.assertEqual(sources[os.path.join(self.first, "helpers_first.py")]["tools"], [])
+        # The imported BaseTool and helper classes are not counted as tools of the tool module
+        tool_entry = sources[os.path.join(self.first, "echo_tool.py")]["tools"]
+        self.assertEqual([tool["name"] for tool in tool_entry], ["echo"])
+
+        lazy = discover_tools(self.config(self.first), silent=True)
+        self.assertEqual(lazy["echo"].execute(text="hi"), {"echo": "HI"})
+
+    def test_manifest_is_rebuilt_when_extra_dirs_change(self):
+        discover_tools(self.config(self.first), silent=True)
+        self.assertEqual(self.manifest()["settings"]["extra_dirs"], [self.first])
+
+        tools = discover_tools(self.config(self.second), silent=True)
+        self.assertIn("shout", tools)
+        self.assertNotIn("echo", tools)
+        manifest = self.manifest()
+        self.assertEqual(manifest["settings"]["extra_dirs"], [self.second])
+        self.assertFalse(any(key.startswith(self.first) for key in manifest["sources"]))
+
+    def test_manifest_from_other_settings_is_ignored(self):
+        discover_tools(self.config(self.first), silent=True)
+        # Tamper with the recorded schema; a manifest for other settings must not be trusted
+        manifest = self.manifest()
+        manifest["sources"][os.path.join(self.first, "echo_tool.py")]["tools"][0]["description"] = "stale"
+        manifest["settings"]["entry_points"] = True
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        tools = discover_tools(self.config(self.first), silent=True)
+        self.assertEqual(tools["echo"].description, "Echoes its input")
+
+
+if __name__ == "__main__":
+    unittest.main()
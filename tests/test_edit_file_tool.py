@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.edit_file_tool import EditFileTool, PatchError, apply_hunks, parse_unified_diff
+
+LINES = [f"line {i}" for i in range(1, 11)]
+
+DIFF = """--- a/file.txt
++++ b/file.txt
+@@ -4,3 +4,3 @@
+ line 4
+-line 5
++line five
+ line 6
+"""
+
+
+class UnifiedDiffTest(unittest.TestCase):
+    def test_parse_skips_file_headers(self):
+        self.assertEqual(parse_unified_diff(DIFF), [(4, ["line 4", "line 5", "line 6"], ["line 4", "line five", "line 6"])])
+
+    def test_parse_without_hunks_fails(self):
+        with self.assertRaises(PatchError):
+            parse_unified_diff("--- a\n+++ b\n")
+
+    def test_apply_at_stated_position(self):
+        result, first_change = apply_hunks(LINES, parse_unified_diff(DIFF))
+        self.assertEqual(result[4], "line five")
+        self.assertEqual(len(result), 10)
+        self.assertEqual(first_change, 3)
+
+    def test_apply_after_context_moved(self):
+        # Two lines inserted above the hunk since the diff was made: it is found at the nearest match
+        moved = ["new a", "new b"] + LINES
+        result, first_change = apply_hunks(moved, parse_unified_diff(DIFF))
+        self.assertEqual(result[6], "line five")
+        self.assertEqual(first_change, 5)
+
+    def test_second_hunk_offset_by_first(self):
+        diff = (
+            "@@ -2,1 +2,3 @@\n-line 2\n+line 2a\n+line 2b\n+line 2c\n"
+            "@@ -8,2 +10,1 @@\n line 8\n-line 9\n"
+        )
+        result, _ = apply_hunks(LINES, parse_unified_diff(diff))
+        self.assertEqual(result[1:4], ["line 2a", "line 2b", "line 2c"])
+        self.assertEqual(result[-3:], ["line 7", "line 8", "line 10"])
+
+    def test_hunk_that_does_not_match_changes_nothing(self):
+        diff = "@@ -1,1 +1,1 @@\n-line 1\n+line one\n@@ -5,1 +5,1 @@\n-not in the file\n+x\n"
+        with self.assertRaises(PatchError):
+            apply_hunks(LINES, parse_unified_diff(diff))
+
+
+class EditFileToolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "file.txt")
+        self.tool = EditFileTool({})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text: str):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+    def read(self) -> str:
+        with open(self.path, encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def test_append_creates_and_extends(self):
+        self.assertTrue(self.tool.execute(self.path, "append", content="a\n")["success"])
+        self.assertTrue(self.tool.execute(self.path, "append", content="b\r\n")["success"])
+        self.assertEqual(self.read(), "a\nb\r\n")
+        self.assertEqual(os.listdir(self.directory.name), ["file.txt"])
+
+    def test_patch_keeps_crlf_and_missing_final_newline(self):
+        self.write("\r\n".join(LINES))
+        result = self.tool.execute(self.path, "patch", diff=DIFF)
+        self.assertTrue(result["success"], result)
+        expected = list(LINES)
+        expected[4] = "line five"
+        self.assertEqual(self.read(), "\r\n".join(expected))
+
+    def test_failed_patch_leaves_file_untouched(self):
+        self.write("\n".join(LINES) + "\n")
+        result = self.tool.execute(self.path, "patch", diff="@@ -3,1 +3,1 @@\n-line 30\n+x\n")
+        self.assertIn("Could not apply diff", result["error"])
+        self.assertEqual(self.read(), "\n".join(LINES) + "\n")
+
+    def test_replace_requires_unique_text(self):
+        self.write("x = 1\nx = 1\n")
+        self.assertIn("occurs 2 times", self.tool.execute(self.path, "replace", old_text="x = 1", new_text="y")["error"])
+        result = self.tool.execute(self.path, "replace", old_text="x = 1", new_text="y", replace_all=True)
+        self.assertEqual(result["replacements"], 2)
+        self.assertEqual(self.read(), "y\ny\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from orchestrator import TaskOrchestrator, SYNTHESIS_FAILED_MARKER
+
+
+class SynthesisFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        with open(os.path.join(ROOT, "config.yaml"), encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        config["tools"]["manifest_path"] = os.path.join(self.directory.name, "manifest.json")
+        config["cache"]["enabled"] = False
+        config_path = os.path.join(self.directory.name, "config.yaml")
+        with open(config_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(config, f)
+        self.orchestrator = TaskOrchestrator(config_path, silent=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def aggregate(self, synthesize):
+        self.orchestrator._synthesize = synthesize
+        tokens = []
+        result = asyncio.run(self.orchestrator._aggregate_consensus(["first", "second"], [], on_token=tokens.append))
+        return result, "".join(tokens)
+
+    def test_failure_after_streaming_keeps_stream_and_result_equal(self):
+        async def synthesize(responses, on_token=None, cancel_token=None):
+            on_token("Half a synth")
+            on_token("esis")
+            raise RuntimeError("connection reset")
+
+        result, streamed = self.aggregate(synthesize)
+        self.assertEqual(result, streamed)
+        self.assertTrue(result.startswith("Half a synthesis" + SYNTHESIS_FAILED_MARKER))
+        self.assertIn("=== Agent 2 Response ===\nsecond", result)
+
+    def test_failure_before_streaming_returns_plain_fallback(self):
+        async def synthesize(responses, on_token=None, cancel_token=None):
+            raise RuntimeError("rate limited")
+
+        result, streamed = self.aggregate(synthesize)
+        self.assertEqual(result, streamed)
+        self.assertNotIn(SYNTHESIS_FAILED_MARKER, result)
+        self.assertTrue(result.startswith("=== Agent 1 Response ===\nfirst"))
+
+
+if __name__ == '__main__':
+    unittest.main()
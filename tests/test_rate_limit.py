@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import asyncio
+import unittest
+import email.utils
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import RateLimiter, classify_error, retry_after_seconds
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def limiter(self, **kwargs) -> RateLimiter:
+        return RateLimiter(clock=self.clock, **kwargs)
+
+    def acquire(self, limiter: RateLimiter, tokens: int = 0):
+        return asyncio.run(limiter.acquire(tokens))
+
+    def wait_for_slot(self, limiter: RateLimiter, tokens: int = 0) -> float:
+        """Delay before a request could be sent now (0 reserves it)"""
+        return limiter._try_reserve(tokens, self.clock())
+
+
+class AimdTest(RateLimiterTestCase):
+    def test_overload_halves_the_limit_once_per_cooldown(self):
+        limiter = self.limiter(initial_concurrency=8, decrease_cooldown=1.0)
+        reservations = [self.acquire(limiter) for _ in range(8)]
+        self.assertEqual(self.wait_for_slot(limiter), float('inf'))
+
+        limiter.release(reservations.pop(), succeeded=False, overloaded=True)
+        self.assertEqual(limiter.concurrency_limit, 4)
+        # A burst of 429s for the same overload only counts once
+        limiter.release(reservations.pop(), succeeded=False, overloaded=True)
+        self.assertEqual(limiter.concurrency_limit, 4)
+
+        self.clock.advance(1.0)
+        limiter.release(reservations.pop(), succeeded=False, overloaded=True)
+        self.assertEqual(limiter.concurrency_limit, 2)
+        self.assertEqual(limiter.stats()["overloaded"], 3)
+
+        # Five requests are still in flight above the new limit of two
+        self.assertEqual(self.wait_for_slot(limiter), float('inf'))
+
+    def test_limit_never_drops_below_min_concurrency(self):
+        limiter = self.limiter(initial_concurrency=4, min_concurrency=3)
+        for _ in range(3):
+            limiter.release(self.acquire(limiter), succeeded=False, overloaded=True)
+            self.clock.advance(5)
+        self.assertEqual(limiter.concurrency_limit, 3)
+
+    def test_successes_recover_additively_up_to_max_concurrency(self):
+        limiter = self.limiter(max_concurrency=4, initial_concurrency=2)
+        limits = []
+        for _ in range(12):
+            limiter.release(self.acquire(limiter))
+            limits.append(limiter.concurrency_limit)
+        # About one slot per limit's worth of successes, then capped
+        self.assertEqual(limits[:3], [2, 2, 3])
+        self.assertEqual(limits, sorted(limits))
+        self.assertEqual(limits[-1], 4)
+        self.assertEqual(limiter.limit, 4.0)
+        self.assertEqual(limiter.stats()["succeeded"], 12)
+
+
+class RetryAfterTest(RateLimiterTestCase):
+    def test_retry_after_blocks_every_caller_until_it_passes(self):
+        limiter = self.limiter(initial_concurrency=4)
+        limiter.release(self.acquire(limiter), succeeded=False, overloaded=True, retry_after=5)
+
+        self.assertEqual(limiter.stats()["blocked_for"], 5)
+        self.assertEqual(self.wait_for_slot(limiter), 5)
+        self.clock.advance(3)
+        self.assertEqual(self.wait_for_slot(limiter), 2)
+        self.clock.advance(2)
+        self.assertEqual(self.wait_for_slot(limiter), 0)
+
+    def test_retry_after_is_ignored_without_overload(self):
+        limiter = self.limiter()
+        limiter.release(self.acquire(limiter), succeeded=False, retry_after=5)
+        self.assertEqual(self.wait_for_slot(limiter), 0)
+
+    def test_blocked_waiter_proceeds_when_woken_after_retry_after(self):
+        limiter = self.limiter(initial_concurrency=4)
+
+        async def scenario():
+            first = await limiter.acquire()
+            second = await limiter.acquire()
+            limiter.release(first, succeeded=False, overloaded=True, retry_after=30)
+
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            self.assertEqual(limiter.stats()["queued"], 1)
+
+            # Retry-After has passed; the next release wakes the waiter to re-check
+            self.clock.advance(30)
+            limiter.release(second)
+            reservation = await asyncio.wait_for(waiter, 1)
+            limiter.release(reservation)
+
+        asyncio.run(scenario())
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+
+class TokenBudgetTest(RateLimiterTestCase):
+    def test_requests_wait_for_the_budget_to_refill(self):
+        limiter = self.limiter(tokens_per_minute=600)
+        reservation = self.acquire(limiter, 400)
+        self.assertEqual(reservation.tokens, 400)
+        self.assertEqual(limiter.stats()["tokens_available"], 200)
+
+        # 200 more tokens at 10 per second
+        self.assertAlmostEqual(self.wait_for_slot(limiter, 400), 20)
+        self.clock.advance(10)
+        self.assertAlmostEqual(self.wait_for_slot(limiter, 400), 10)
+        self.clock.advance(10)
+        self.assertEqual(self.wait_for_slot(limiter, 400), 0)
+        self.assertEqual(limiter.stats()["tokens_available"], 0)
+
+    def test_release_charges_the_tokens_actually_used(self):
+        limiter = self.limiter(tokens_per_minute=600)
+        reservation = self.acquire(limiter, 400)
+        limiter.release(reservation, tokens_used=100)
+        self.assertEqual(limiter.stats()["tokens_available"], 500)
+
+        reservation = self.acquire(limiter, 400)
+        limiter.release(reservation, tokens_used=700)
+        self.assertEqual(limiter.stats()["tokens_available"], -200)
+        self.assertAlmostEqual(self.wait_for_slot(limiter, 1), 20.1)
+
+    def test_budget_refills_only_up_to_one_minute(self):
+        limiter = self.limiter(tokens_per_minute=600)
+        self.clock.advance(3600)
+        self.assertEqual(limiter.stats()["tokens_available"], 600)
+
+    def test_request_larger_than_the_budget_takes_all_of_it(self):
+        limiter = self.limiter(tokens_per_minute=600)
+        reservation = self.acquire(limiter, 5000)
+        self.assertEqual(reservation.tokens, 600)
+        self.assertAlmostEqual(self.wait_for_slot(limiter, 5000), 60)
+
+
+class BackoffTest(RateLimiterTestCase):
+    def test_backoff_is_jittered_below_the_exponential_cap(self):
+        limiter = self.limiter(backoff_base=0.5, backoff_max=3)
+        for attempt in range(8):
+            for _ in range(20):
+                self.assertLessEqual(limiter.backoff(attempt), min(3, 0.5 * 2 ** attempt))
+        self.assertEqual(limiter.stats()["retries"], 160)
+
+
+class RetryAfterHeaderTest(unittest.TestCase):
+    def test_seconds_milliseconds_and_dates(self):
+        self.assertIsNone(retry_after_seconds(None))
+        self.assertIsNone(retry_after_seconds({}))
+        self.assertEqual(retry_after_seconds({"retry-after": "7"}), 7)
+        self.assertEqual(retry_after_seconds({"retry-after": "-3"}), 0)
+        # retry-after-ms is more precise and wins
+        self.assertEqual(retry_after_seconds({"retry-after-ms": "1500", "retry-after": "7"}), 1.5)
+        self.assertEqual(retry_after_seconds({"retry-after-ms": "soon", "retry-after": "7"}), 7)
+        self.assertIsNone(retry_after_seconds({"retry-after": "soon"}))
+
+        date = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(retry_after_seconds({"retry-after": date}), 60, delta=2)
+        past = email.utils.formatdate(0, usegmt=True)
+        self.assertEqual(retry_after_seconds({"retry-after": past}), 0)
+
+
+@unittest.skipIf(openai is None, "openai is not installed")
+class ClassifyErrorTest(unittest.TestCase):
+    def status_error(self, status: int, headers: dict = None):
+        request = SimpleNamespace(method="POST", url="https://openrouter.ai/api/v1/chat/completions")
+        response = SimpleNamespace(status_code=status, headers=headers or {}, request=request)
+        return openai.APIStatusError(f"status {status}", response=response, body=None)
+
+    def test_status_errors(self):
+        self.assertEqual(classify_error(self.status_error(429, {"retry-after": "2"})), (True, True, 2))
+        self.assertEqual(classify_error(self.status_error(503)), (True, True, None))
+        self.assertEqual(classify_error(self.status_error(502)), (True, False, None))
+        self.assertEqual(classify_error(self.status_error(520)), (True, False, None))
+        self.assertEqual(classify_error(self.status_error(408)), (True, False, None))
+        self.assertEqual(classify_error(self.status_error(400)), (False, False, None))
+        self.assertEqual(classify_error(self.status_error(401)), (False, False, None))
+
+    def test_connection_errors_are_retryable(self):
+        request = SimpleNamespace(method="POST", url="https://openrouter.ai/api/v1/chat/completions")
+        self.assertEqual(classify_error(openai.APIConnectionError(request=request)), (True, False, None))
+        self.assertEqual(classify_error(openai.APITimeoutError(request)), (True, False, None))
+
+    def test_other_errors_are_not_retried(self):
+        self.assertEqual(classify_error(ValueError("bad")), (False, False, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
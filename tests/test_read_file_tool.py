@@ -0,0 +1,112 @@
+import os
+import sys
+import mmap
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.read_file_tool import LineIndex, ReadFileTool
+
+
+class ReadFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "file.txt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data: bytes):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+
+class LineIndexTest(ReadFileTestCase):
+    def test_seek_matches_line_starts_across_checkpoints(self):
+        lines = [f"line {i}\n".encode() for i in range(100)]
+        self.write(b"".join(lines))
+        starts = [sum(len(line) for line in lines[:i]) for i in range(100)]
+
+        index = LineIndex(stride=7)
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Out of order, so later seeks reuse checkpoints made by earlier ones
+            for line in (50, 3, 99, 0, 7, 14, 63, 98):
+                self.assertEqual(index.seek(mm, line), starts[line], line)
+            self.assertIsNone(index.seek(mm, 100))
+            self.assertIsNone(index.seek(mm, 1000))
+            self.assertTrue(index.complete)
+            self.assertEqual(list(index.checkpoints), [starts[i] for i in range(0, 100, 7)])
+
+    def test_index_is_extended_only_as_far_as_needed(self):
+        self.write(b"x\n" * 1000)
+        index = LineIndex(stride=10)
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index.seek(mm, 25)
+        self.assertEqual(len(index.checkpoints), 3)
+        self.assertFalse(index.complete)
+
+
+class ReadFileToolTest(ReadFileTestCase):
+    def test_tail_with_and_without_trailing_newline(self):
+        tool = ReadFileTool({})
+        self.write(b"a\nb\nc\nd\n")
+        self.assertEqual(tool.execute(self.path, tail=2)["content"], "c\nd")
+        self.write(b"a\nb\nc\nd")
+        self.assertEqual(tool.execute(self.path, tail=2)["content"], "c\nd")
+        self.assertEqual(tool.execute(self.path, tail=10)["content"], "a\nb\nc\nd")
+
+    def test_tail_of_crlf_file(self):
+        tool = ReadFileTool({})
+        self.write(b"one\r\ntwo\r\nthree\r\n")
+        self.assertEqual(tool.execute(self.path, tail=2)["content"], "two\r\nthree")
+
+    def test_tail_across_blocks(self):
+        tool = ReadFileTool({'read_file': {'max_bytes': 10 ** 6}})
+        lines = [f"{i:06d}" for i in range(30000)]
+        self.write(("\n".join(lines) + "\n").encode())
+        self.assertEqual(tool.execute(self.path, tail=15000)["content"], "\n".join(lines[-15000:]))
+
+    def test_paging_with_next_offset(self):
+        tool = ReadFileTool({'read_file': {'index_stride': 4}})
+        self.write("".join(f"row {i}\n" for i in range(20)).encode())
+        result = tool.execute(self.path, offset=9, limit=3)
+        self.assertEqual(result["content"], "row 9\nrow 10\nrow 11\n")
+        self.assertEqual(result["next_offset"], 12)
+        self.assertIsNone(tool.execute(self.path, offset=18, limit=5)["next_offset"])
+
+    def test_max_bytes_caps_every_mode(self):
+        tool = ReadFileTool({'read_file': {'max_bytes': 100}})
+        self.write(b"".join(f"line {i:03d}\n".encode() for i in range(100)))
+
+        whole = tool.execute(self.path)
+        self.assertTrue(whole["truncated"])
+        self.assertIn("[truncated: showing 99 of 900 bytes", whole["content"])
+
+        page = tool.execute(self.path, offset=10, limit=50)
+        self.assertTrue(page["truncated"])
+        self.assertEqual(page["lines"], 11)
+        self.assertEqual(page["next_offset"], 21)
+
+        tail = tool.execute(self.path, tail=50)
+        self.assertTrue(tail["truncated"])
+        self.assertTrue(tail["content"].endswith("line 099"))
+
+        byte_range = tool.execute(self.path, byte_start=0, byte_end=500)
+        self.assertEqual(byte_range["byte_end"], 100)
+        self.assertTrue(byte_range["truncated"])
+
+    def test_single_line_longer_than_cap_continues_by_bytes(self):
+        tool = ReadFileTool({'read_file': {'max_bytes': 100}})
+        self.write(b"x" * 1000 + b"\nshort\n")
+        result = tool.execute(self.path, offset=0, limit=1)
+        self.assertEqual(result["lines"], 0)
+        self.assertEqual(result["next_byte_start"], 100)
+
+    def test_default_cap_follows_tool_result_budget(self):
+        self.assertEqual(ReadFileTool({'context': {'tool_result_max_tokens': 1000}}).max_bytes, 3000)
+        self.assertEqual(ReadFileTool({'read_file': {'max_bytes': 500}}).max_bytes, 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,39 +1,52 @@
-import os
-import importlib
-from typing import Dict, List
+from typing import Dict
 from .base_tool import BaseTool
+from .discovery import tool_sources, manifest_settings, load_manifest, save_manifest, lazy_tools, loaded_tools
 
 def discover_tools(config: dict = None, silent: bool = False) -> Dict[str, BaseTool]:
-    """Automatically discover and load all tools from the tools directory"""
+    """
+    Automatically discover and load all tools from the tools directory,
+    tools.extra_dirs and installed "mao.tools" entry points.
+
+    With tools.lazy (the default) tool schemas come from a manifest cached
+    on disk and keyed on each source's mtime and size, and a tool's module is
+    only imported the first time the tool is executed. Sources that changed
+    since the manifest was written are imported to refresh it, and the whole
+    manifest is rebuilt when tools.extra_dirs or tools.entry_points change.
+    A module defines tools by containing concrete BaseTool subclasses, so
+    helper modules next to the tools need no registration.
+    """
+    config = config or {}
+    tools_config = config.get('tools', {})
+    lazy = tools_config.get('lazy', True)
+    manifest_path = tools_config.get('manifest_path', '.mao_cache/tool_manifest.json')
+
     tools = {}
-    
-    # Get the tools directory path
-    tools_dir = os.path.dirname(__file__)
-    
-    # Scan for Python files (excluding __init__.py and base_tool.py)
-    for filename in os.listdir(tools_dir):
-        if filename.endswith('.py') and filename not in ['__init__.py', 'base_tool.py']:
-            module_name = filename[:-3]  # Remove .py extension
-            
-            try:
-                # Import the module
-                module = importlib.import_module(f'.{module_name}', package='tools')
-                
-                # Find tool classes that inherit from BaseTool
-                for item_name in dir(module):
-                    item = getattr(module, item_name)
-                    if (isinstance(item, type) and 
-                        issubclass(item, BaseTool) and 
-                        item != BaseTool):
-                        
-                        # Instantiate the tool
-                        tool_instance = item(config or {})
-                        tools[tool_instance.name] = tool_instance
-                        if not silent:
-                            print(f"Loaded tool: {tool_instance.name}")
-                        
-            except Exception as e:
-                if not silent:
-                    print(f"Warning: Could not load tool from {filename}: {e}")
-    
-    return tools
\ No newline at end of file
+    settings = manifest_settings(config)
+    manifest = load_manifest(manifest_path, settings) if lazy else {}
+    fresh_manifest = {}
+
+    for source in tool_sources(config):
+        entry = manifest.get(source.key)
+        try:
+            if entry is not None and entry.get("fingerprint") == source.fingerprint:
+                source_tools = lazy_tools(source, entry, config)
+            else:
+                source_tools = loaded_tools(source, config, lazy)
+                entry = {"fingerprint": source.fingerprint, "tools": [tool.metadata for tool in source_tools]} if lazy else None
+        except Exception as e:
+            if not silent:
+                print(f"Warning: Could not load tool from {source.label}: {e}")
+            continue
+
+        if entry is not None:
+            fresh_manifest[source.key] = entry
+        for tool_instance in source_tools:
+            tools[tool_instance.name] = tool_instance
+            if not silent:
+                print(f"Loaded tool: {tool_instance.name}")
+
+    # Rewrite the manifest only when a source was added, changed or removed (or the settings changed)
+    if lazy and fresh_manifest != manifest:
+        save_manifest(manifest_path, fresh_manifest, settings)
+
+    return tools
@@ -0,0 +1,65 @@
+import os
+import secrets
+import threading
+from collections import defaultdict
+
+_path_locks = defaultdict(threading.Lock)
+_path_locks_lock = threading.Lock()
+
+def path_lock(path: str) -> threading.Lock:
+    """
+    Lock serialising read-modify-write cycles on one file within this process,
+    so concurrent edits from parallel agents don't overwrite each other.
+    """
+    with _path_locks_lock:
+        return _path_locks[os.path.realpath(path)]
+
+
+def _create_temp(path: str):
+    """
+    Open a new, uniquely named file next to path. It is created with mode 0666
+    like open() does, so the kernel applies the umask; a new file ends up with
+    the same mode a plain write would give it, without reading or changing the
+    process-wide umask.
+    """
+    directory, name = os.path.split(path)
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def atomic_write(path: str, content: str) -> int:
+    """
+    Replace path with content via a uniquely named temporary file in the same
+    directory and a rename, so readers never see a partial file and concurrent
+    writers never share a temporary file. Returns the bytes written.
+    """
+    abs_path = os.path.abspath(path)
+    parent_dir = os.path.dirname(abs_path)
+    if parent_dir and not os.path.exists(parent_dir):
+        os.makedirs(parent_dir, exist_ok=True)
+
+    try:
+        mode = os.stat(abs_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+
+    data = content.encode('utf-8')
+    fd, temp_path = _create_temp(abs_path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, abs_path)
+    except BaseException:
+        # Clean up the temp file; the original file is untouched
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return len(data)
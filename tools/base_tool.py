@@ -1,5 +1,10 @@
+import time
+import contextvars
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+# Deadline (time.monotonic()) of the agent on whose behalf a tool is running, if any
+tool_deadline: contextvars.ContextVar = contextvars.ContextVar("tool_deadline", default=None)
 
 class BaseTool(ABC):
     """Base class for all tools"""
@@ -22,11 +27,28 @@ class BaseTool(ABC):
         """OpenRouter function parameters schema"""
         pass
     
+    @property
+    def idempotent(self) -> bool:
+        """Whether identical calls can safely share one execution (no side effects)"""
+        return False
+    
     @abstractmethod
     def execute(self, **kwargs) -> Any:
         """Execute the tool with given parameters"""
         pass
     
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """Tool-specific counters reported in runtime statistics (None if the tool keeps none)"""
+        return None
+    
+    def remaining_time(self, default: Optional[float] = None) -> Optional[float]:
+        """Seconds left before the calling agent's deadline, capped at default"""
+        deadline = tool_deadline.get()
+        if deadline is None:
+            return default
+        remaining = max(0.0, deadline - time.monotonic())
+        return remaining if default is None else min(default, remaining)
+    
     def to_openrouter_schema(self) -> Dict[str, Any]:
         """Convert tool to OpenRouter function schema"""
         return {
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional
+
+class TieredCache:
+    """
+    Two-level cache: an in-process LRU in front of a SQLite store.
+
+    Entries live in a namespace (e.g. "query" or "page_text"), carry their own TTL and
+    are JSON-serialized so the SQLite file can be shared by several processes.
+    Both levels are bounded by total value bytes and evict least recently used
+    entries first. clock (time.time by default, since expiry times are shared
+    through the file) stamps expiry and access times.
+    """
+
+    # How many disk writes happen between size checks on the SQLite store
+    EVICT_INTERVAL = 32
+
+    def __init__(self, path: Optional[str], memory_max_bytes: int = 16 * 1024 * 1024,
+                 disk_max_bytes: int = 256 * 1024 * 1024, clock: Callable[[], float] = time.time):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # (namespace, key) -> (expires_at, value, size)
+        self._memory_bytes = 0
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+        self._db = None
+        self._writes_since_evict = 0
+        if path:
+            try:
+                self._db = self._open_db(path)
+            except (sqlite3.Error, OSError):
+                # Fall back to a memory-only cache if the store can't be opened
+                self._db = None
+        self.path = path if self._db is not None else None
+
+    def _open_db(self, path: str) -> sqlite3.Connection:
+        parent_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent_dir, exist_ok=True)
+
+        db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        return db
+
+    def get(self, namespace: str, key: str) -> Any:
+        """Return the cached value or None on a miss"""
+        now = self.clock()
+
+        with self._lock:
+            counters = self._counters[namespace]
+            expired = False
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                expires_at, value, size = entry
+                if expires_at > now:
+                    self._memory.move_to_end((namespace, key))
+                    counters["memory_hits"] += 1
+                    return value
+                self._drop_memory((namespace, key))
+                expired = True
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, size, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                        (namespace, key)
+                    ).fetchone()
+                    if row is not None:
+                        raw, size, expires_at = row
+                        if expires_at > now:
+                            self._db.execute(
+                                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                                (now, namespace, key)
+                            )
+                            value = json.loads(raw)
+                            self._put_memory((namespace, key), expires_at, value, size)
+                            counters["disk_hits"] += 1
+                            return value
+                        self._db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                        expired = True
+                except sqlite3.Error:
+                    counters["disk_errors"] += 1
+
+            # One lookup counts once, even when the entry had expired in both tiers
+            if expired:
+                counters["expired"] += 1
+            counters["misses"] += 1
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for ttl seconds"""
+        raw = json.dumps(value)
+        size = len(raw.encode('utf-8'))
+        now = self.clock()
+        expires_at = now + ttl
+
+        with self._lock:
+            self._counters[namespace]["writes"] += 1
+            self._put_memory((namespace, key), expires_at, value, size)
+
+            if self._db is not None and size <= self.disk_max_bytes:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires_at, accessed_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (namespace, key, raw, size, expires_at, now)
+                    )
+                    self._writes_since_evict += 1
+                    if self._writes_since_evict >= self.EVICT_INTERVAL:
+                        self._evict_disk(now)
+                except sqlite3.Error:
+                    self._counters[namespace]["disk_errors"] += 1
+
+    def _put_memory(self, memory_key, expires_at, value, size):
+        if memory_key in self._memory:
+            self._drop_memory(memory_key)
+        if size > self.memory_max_bytes:
+            return
+
+        self._memory[memory_key] = (expires_at, value, size)
+        self._memory_bytes += size
+
+        # Evict least recently used entries until we fit again
+        while self._memory_bytes > self.memory_max_bytes:
+            oldest_key = next(iter(self._memory))
+            self._drop_memory(oldest_key)
+            self._counters[oldest_key[0]]["memory_evictions"] += 1
+
+    def _drop_memory(self, memory_key):
+        _, _, size = self._memory.pop(memory_key)
+        self._memory_bytes -= size
+
+    def _evict_disk(self, now: float):
+        """Remove expired rows, then least recently used rows over the byte cap"""
+        self._writes_since_evict = 0
+        self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+
+        excess = total - self.disk_max_bytes
+        rows = self._db.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall()
+        victims = []
+        for namespace, key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((namespace, key))
+            excess -= size
+            self._counters[namespace]["disk_evictions"] += 1
+        self._db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+
+    def close(self):
+        """Close the SQLite store; the cache keeps working from memory only"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                self.path = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters per namespace plus current memory usage"""
+        with self._lock:
+            namespaces = {}
+            for namespace, counters in self._counters.items():
+                counts = dict(counters)
+                lookups = counts.get("memory_hits", 0) + counts.get("disk_hits", 0) + counts.get("misses", 0)
+                hits = counts.get("memory_hits", 0) + counts.get("disk_hits", 0)
+                counts["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+                namespaces[namespace] = counts
+
+            return {
+                "path": self.path,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "namespaces": namespaces
+            }
+
+
+def cache_from_config(config: dict) -> Optional[TieredCache]:
+    """Build the cache described by the `cache` config section, or None if disabled"""
+    cache_config = config.get('cache', {})
+    if not cache_config.get('enabled', True):
+        return None
+
+    return TieredCache(
+        path=cache_config.get('path', '.mao_cache/search_cache.sqlite'),
+        memory_max_bytes=cache_config.get('memory_max_bytes', 16 * 1024 * 1024),
+        disk_max_bytes=cache_config.get('disk_max_bytes', 256 * 1024 * 1024)
+    )
@@ -1,18 +1,123 @@
 from .base_tool import BaseTool
+from collections import OrderedDict
+import multiprocessing
+import threading
+import functools
 import math
 import ast
 import operator
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class TooExpensive(ValueError):
+    """An expression whose evaluation would exceed the calculator's resource limits"""
+    pass
+
+
+class _Scope:
+    """What a compiled expression is evaluated against"""
+    __slots__ = ("names", "operators")
+    
+    def __init__(self, names: dict, operators: dict):
+        self.names = names
+        self.operators = operators
+
+
+def _elementwise(func):
+    """Lift a scalar function to lists: applied element by element, scalars broadcast"""
+    def lifted(*args):
+        lengths = {len(arg) for arg in args if isinstance(arg, list)}
+        if not lengths:
+            return func(*args)
+        if len(lengths) > 1:
+            raise ValueError(f"Arrays have different lengths: {sorted(lengths)}")
+        length = lengths.pop()
+        return [lifted(*(arg[i] if isinstance(arg, list) else arg for arg in args)) for i in range(length)]
+    return lifted
+
+
+def _aggregate(func, elementwise):
+    """sum/max/min of a single array reduce it; with several arguments they work element-wise"""
+    def aggregate(*args):
+        if len(args) == 1:
+            return func(args[0])
+        return elementwise(*args)
+    return aggregate
+
+
+def _sum(*args):
+    """Total of one iterable, or of several arguments (like max and min)"""
+    if len(args) == 1:
+        return sum(args[0])
+    return functools.reduce(operator.add, args)
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _worker_main(conn, config: dict):
+    """Worker process: evaluate batches sent by the parent, sending each result back as soon as it is ready"""
+    tool = CalculatorTool(config)
+    conn.send("ready")
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        expressions, variables = request
+        scope = tool._scope(variables)
+        for expression in expressions:
+            conn.send(tool._evaluate(expression, scope))
+
+
+class _Worker:
+    """A spawned evaluation process that can be killed when an expression runs past its budget"""
+    
+    def __init__(self, config: dict, startup_timeout: float = 30.0):
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, config),
+                                       name="calculator-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        try:
+            ready = self.conn.poll(startup_timeout) and self.conn.recv() == "ready"
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self.kill()
+            raise RuntimeError("Calculator worker failed to start")
+    
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
 class CalculatorTool(BaseTool):
     def __init__(self, config: dict):
         self.config = config
-        # Safe operators for evaluation
+        calculator_config = config.get('calculator', {})
+        
+        # Resource limits, checked before and during evaluation
+        self.max_nodes = calculator_config.get('max_nodes', 200)
+        self.max_integer_bits = calculator_config.get('max_integer_bits', 4096)
+        self.max_exponent = calculator_config.get('max_exponent', 10000)
+        self.max_array_length = calculator_config.get('max_array_length', 100000)
+        
+        # Safe operators for evaluation (integer growth checked before computing)
         self.safe_operators = {
             ast.Add: operator.add,
             ast.Sub: operator.sub,
-            ast.Mult: operator.mul,
+            ast.Mult: self._checked_mul,
             ast.Div: operator.truediv,
-            ast.Pow: operator.pow,
+            ast.Pow: self._checked_pow,
             ast.USub: operator.neg,
             ast.UAdd: operator.pos,
             ast.Mod: operator.mod,
@@ -24,7 +129,7 @@ class CalculatorTool(BaseTool):
             'round': round,
             'max': max,
             'min': min,
-            'sum': sum,
+            'sum': _sum,
             'sqrt': math.sqrt,
             'sin': math.sin,
             'cos': math.cos,
@@ -35,6 +140,54 @@ class CalculatorTool(BaseTool):
             'pi': math.pi,
             'e': math.e,
         }
+        
+        # Array variables: NumPy when available, otherwise element-wise over plain lists
+        self.use_numpy = np is not None and calculator_config.get('use_numpy', True)
+        if self.use_numpy:
+            self.array_operators = self.safe_operators
+            self.array_functions = {
+                'abs': np.abs,
+                'round': np.round,
+                'max': lambda *args: np.max(args[0]) if len(args) == 1 else functools.reduce(np.maximum, args),
+                'min': lambda *args: np.min(args[0]) if len(args) == 1 else functools.reduce(np.minimum, args),
+                'sum': lambda *args: np.sum(args[0]) if len(args) == 1 else functools.reduce(np.add, args),
+                'sqrt': np.sqrt,
+                'sin': np.sin,
+                'cos': np.cos,
+                'tan': np.tan,
+                'log': lambda x, base=None: np.log(x) if base is None else np.log(x) / np.log(base),
+                'log10': np.log10,
+                'exp': np.exp,
+                'pi': math.pi,
+                'e': math.e,
+            }
+        else:
+            self.array_operators = {op: _elementwise(func) for op, func in self.safe_operators.items()}
+            self.array_functions = {
+                name: _elementwise(func) if callable(func) else func
+                for name, func in self.safe_functions.items()
+            }
+            for name in ('max', 'min', 'sum'):
+                self.array_functions[name] = _aggregate(self.safe_functions[name], self.array_functions[name])
+        
+        # Expression -> compiled closure, least recently used evicted first
+        self.cache_size = calculator_config.get('cache_size', 256)
+        self._compiled = OrderedDict()
+        self._compiled_lock = threading.Lock()
+        
+        # Evaluation in killable worker processes, so a runaway expression only costs its own budget
+        self.isolate = calculator_config.get('isolate', True)
+        self.time_budget = calculator_config.get('time_budget', 2.0)
+        self.workers = max(1, calculator_config.get('workers', 2))
+        self._worker_config = {'calculator': {**calculator_config, 'isolate': False}}
+        self._idle_workers = []
+        self._workers_lock = threading.Lock()
+        self._worker_slots = threading.BoundedSemaphore(self.workers)
+        
+        self._prestarted = False
+        
+        self.evaluation_stats = {"evaluations": 0, "rejected": 0, "timeouts": 0, "workers_started": 0}
+        self._stats_lock = threading.Lock()
     
     @property
     def name(self) -> str:
@@ -42,7 +195,16 @@ class CalculatorTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Perform mathematical calculations and evaluations"
+        return (
+            "Perform mathematical calculations and evaluations. Evaluate many expressions in one call with "
+            "'expressions', and bind names with 'variables'; a variable may be an array of numbers, in which "
+            "case expressions are evaluated element-wise (sum, max and min of a single array reduce it). "
+            "Expressions that would take too long (e.g. huge powers) fail with error_type 'too_expensive'."
+        )
+    
+    @property
+    def idempotent(self) -> bool:
+        return True
     
     @property
     def parameters(self) -> dict:
@@ -52,58 +214,339 @@ class CalculatorTool(BaseTool):
                 "expression": {
                     "type": "string",
                     "description": "Mathematical expression to evaluate (e.g., '2 + 3 * 4', 'sqrt(16)', 'sin(pi/2)')"
+                },
+                "expressions": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Several expressions to evaluate in one call; results are returned in the same order"
+                },
+                "variables": {
+                    "type": "object",
+                    "description": "Names usable in the expressions, mapped to a number or an array of numbers (e.g. {\"x\": [1, 2, 3], \"rate\": 0.05})"
                 }
-            },
-            "required": ["expression"]
+            }
         }
     
-    def _safe_eval(self, node):
-        """Safely evaluate an AST node"""
+    def _checked_pow(self, base, exponent):
+        if _is_int(exponent):
+            if exponent > self.max_exponent:
+                raise TooExpensive(f"Exponent {exponent} exceeds the limit of {self.max_exponent}")
+            if _is_int(base) and exponent > 0 and abs(base) > 1:
+                bits = int(math.log2(abs(base)) * exponent) + 1
+                if bits > self.max_integer_bits:
+                    raise TooExpensive(f"Result would have about {bits} bits (limit {self.max_integer_bits})")
+        return operator.pow(base, exponent)
+    
+    def _checked_mul(self, left, right):
+        if _is_int(left) and _is_int(right) and left.bit_length() + right.bit_length() > self.max_integer_bits:
+            raise TooExpensive(f"Product would have about {left.bit_length() + right.bit_length()} bits "
+                               f"(limit {self.max_integer_bits})")
+        return operator.mul(left, right)
+    
+    def _estimate_bits(self, node):
+        """
+        Upper bound on the bit length of an integer-valued constant subexpression,
+        or None when it depends on variables, functions or floats.
+        """
+        if isinstance(node, ast.Constant):
+            return node.value.bit_length() if _is_int(node.value) else None
+        if isinstance(node, ast.UnaryOp):
+            return self._estimate_bits(node.operand)
+        if not isinstance(node, ast.BinOp):
+            return None
+        if isinstance(node.op, ast.Pow) and isinstance(node.right, ast.UnaryOp) and isinstance(node.right.op, ast.USub):
+            # A negative exponent gives a float, however large it is: constant cost, not an integer
+            return None
+        
+        left = self._estimate_bits(node.left)
+        right = self._estimate_bits(node.right)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            return max(left, right) + 1
+        if isinstance(node.op, ast.Mult):
+            return left + right
+        if isinstance(node.op, ast.Mod):
+            return min(left, right)
+        if isinstance(node.op, ast.Pow):
+            # An exponent of b bits is below 2**b; past a few thousand bits the bound is only "too big"
+            if right > 64:
+                return float('inf')
+            if isinstance(node.left, ast.Constant):
+                # log2 of the base rather than its bit length, so 2**4000 is 4001 bits and not 8000
+                left = math.log2(abs(node.left.value)) if abs(node.left.value) > 1 else 0
+            if isinstance(node.right, ast.Constant):
+                return int(left * node.right.value) + 1 if node.right.value > 0 else 1
+            return int(left * 2 ** right) + 1
+        return None
+    
+    def _check_cost(self, tree):
+        """Reject expressions that are too large, or whose constant parts grow too big, before evaluating them"""
+        nodes = sum(1 for _ in ast.walk(tree))
+        if nodes > self.max_nodes:
+            raise TooExpensive(f"Expression has {nodes} syntax nodes (limit {self.max_nodes})")
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and _is_int(node.value) and node.value.bit_length() > self.max_integer_bits:
+                raise TooExpensive(f"Integer constant exceeds {self.max_integer_bits} bits")
+            if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+                # Only positive exponents are limited; a negative one yields a (tiny) float
+                exponent = node.right
+                if isinstance(exponent, ast.UnaryOp) and isinstance(exponent.op, ast.UAdd):
+                    exponent = exponent.operand
+                if isinstance(exponent, ast.Constant) and exponent.value > self.max_exponent:
+                    raise TooExpensive(f"Exponent {exponent.value} exceeds the limit of {self.max_exponent}")
+        bits = self._estimate_bits(tree)
+        if bits is not None and bits > self.max_integer_bits:
+            raise TooExpensive(f"Result is too large to compute (limit {self.max_integer_bits} bits)")
+    
+    def _compile(self, node):
+        """Turn an AST node into a closure evaluated against a _Scope, rejecting anything unsafe"""
         if isinstance(node, ast.Constant):  # Numbers
-            return node.value
+            value = node.value
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ValueError(f"Unsupported constant: {value!r}")
+            return lambda scope: value
         elif isinstance(node, ast.Name):  # Variables/constants
-            if node.id in self.safe_functions:
-                return self.safe_functions[node.id]
-            else:
-                raise ValueError(f"Unknown variable: {node.id}")
+            name = node.id
+            def load(scope):
+                try:
+                    return scope.names[name]
+                except KeyError:
+                    raise ValueError(f"Unknown variable: {name}")
+            return load
         elif isinstance(node, ast.BinOp):  # Binary operations
-            left = self._safe_eval(node.left)
-            right = self._safe_eval(node.right)
-            if type(node.op) in self.safe_operators:
-                return self.safe_operators[type(node.op)](left, right)
-            else:
-                raise ValueError(f"Unsupported operation: {type(node.op)}")
+            op_type = type(node.op)
+            if op_type not in self.safe_operators:
+                raise ValueError(f"Unsupported operation: {op_type}")
+            left = self._compile(node.left)
+            right = self._compile(node.right)
+            return lambda scope: scope.operators[op_type](left(scope), right(scope))
         elif isinstance(node, ast.UnaryOp):  # Unary operations
-            operand = self._safe_eval(node.operand)
-            if type(node.op) in self.safe_operators:
-                return self.safe_operators[type(node.op)](operand)
-            else:
-                raise ValueError(f"Unsupported unary operation: {type(node.op)}")
+            op_type = type(node.op)
+            if op_type not in self.safe_operators:
+                raise ValueError(f"Unsupported unary operation: {op_type}")
+            operand = self._compile(node.operand)
+            return lambda scope: scope.operators[op_type](operand(scope))
         elif isinstance(node, ast.Call):  # Function calls
-            func = self._safe_eval(node.func)
-            args = [self._safe_eval(arg) for arg in node.args]
-            return func(*args)
+            if node.keywords:
+                raise ValueError("Keyword arguments are not supported")
+            func = self._compile(node.func)
+            args = [self._compile(arg) for arg in node.args]
+            return lambda scope: func(scope)(*[arg(scope) for arg in args])
         else:
             raise ValueError(f"Unsupported node type: {type(node)}")
     
-    def execute(self, expression: str) -> dict:
-        """Execute mathematical calculation"""
+    def compile_expression(self, expression: str):
+        """Parse, validate and compile an expression once; later calls hit the LRU cache"""
+        with self._compiled_lock:
+            compiled = self._compiled.get(expression)
+            if compiled is not None:
+                self._compiled.move_to_end(expression)
+                return compiled
+        
+        tree = ast.parse(expression, mode='eval').body
+        self._check_cost(tree)
+        compiled = self._compile(tree)
+        with self._compiled_lock:
+            self._compiled[expression] = compiled
+            while len(self._compiled) > self.cache_size:
+                self._compiled.popitem(last=False)
+        return compiled
+    
+    def _scope(self, variables: dict) -> _Scope:
+        """Scope for the given variable bindings, switching to array evaluation if any is a list"""
+        for name, value in variables.items():
+            if not name.isidentifier():
+                raise ValueError(f"Invalid variable name: {name}")
+            if name in self.safe_functions:
+                raise ValueError(f"Variable name shadows a built-in: {name}")
+            values = value if isinstance(value, list) else [value]
+            if not all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in values):
+                raise ValueError(f"Variable {name} must be a number or an array of numbers")
+            if len(values) > self.max_array_length:
+                raise TooExpensive(f"Variable {name} has {len(values)} elements (limit {self.max_array_length})")
+            if any(_is_int(item) and item.bit_length() > self.max_integer_bits for item in values):
+                raise TooExpensive(f"Variable {name} holds an integer over {self.max_integer_bits} bits")
+        
+        if not any(isinstance(value, list) for value in variables.values()):
+            return _Scope({**self.safe_functions, **variables}, self.safe_operators)
+        if self.use_numpy:
+            # Integers beyond int64 would give object arrays evaluated by Python; use floats instead
+            variables = {name: self._array(value) if isinstance(value, list) else value
+                         for name, value in variables.items()}
+        return _Scope({**self.array_functions, **variables}, self.array_operators)
+    
+    def _array(self, values: list):
+        array = np.asarray(values)
+        return array.astype(float) if array.dtype == object else array
+    
+    def _result(self, value):
+        """Plain Python value of a result (NumPy arrays and scalars become lists and numbers)"""
+        if np is not None and isinstance(value, (np.ndarray, np.generic)):
+            return value.tolist()
+        return value
+    
+    def _evaluate(self, expression: str, scope: _Scope) -> dict:
         try:
-            # Parse the expression
-            tree = ast.parse(expression, mode='eval')
-            
-            # Evaluate safely
-            result = self._safe_eval(tree.body)
-            
+            # Parse the expression (cached) and evaluate it safely
+            result = self.compile_expression(expression)(scope)
             return {
                 "expression": expression,
-                "result": result,
+                "result": self._result(result),
                 "success": True
             }
         
+        except TooExpensive as e:
+            return self._too_expensive(expression, str(e))
         except Exception as e:
             return {
                 "expression": expression,
                 "error": str(e),
                 "success": False
-            }
\ No newline at end of file
+            }
+    
+    def _too_expensive(self, expression: str, message: str) -> dict:
+        return {
+            "expression": expression,
+            "error": message,
+            "error_type": "too_expensive",
+            "success": False
+        }
+    
+    def _count(self, results: list, timeouts: int = 0):
+        with self._stats_lock:
+            self.evaluation_stats["evaluations"] += len(results)
+            self.evaluation_stats["rejected"] += sum(result.get("error_type") == "too_expensive" for result in results)
+            self.evaluation_stats["timeouts"] += timeouts
+    
+    def stats(self) -> dict:
+        """Evaluations, too-expensive results (timeouts included), timeouts (killed workers) and workers started"""
+        with self._stats_lock:
+            return dict(self.evaluation_stats)
+    
+    def _start_worker(self) -> _Worker:
+        worker = _Worker(self._worker_config)
+        with self._stats_lock:
+            self.evaluation_stats["workers_started"] += 1
+        return worker
+    
+    def _acquire_worker(self) -> _Worker:
+        self._worker_slots.acquire()
+        with self._workers_lock:
+            if self._idle_workers:
+                return self._idle_workers.pop()
+        try:
+            return self._start_worker()
+        except BaseException:
+            self._worker_slots.release()
+            raise
+    
+    def _prestart_workers(self):
+        # Fill the free slots with new processes; never waits for a slot held by a running evaluation
+        for _ in range(self.workers - 1):
+            if not self._worker_slots.acquire(blocking=False):
+                return
+            try:
+                worker = self._start_worker()
+            except Exception:
+                self._worker_slots.release()
+                return
+            self._release_worker(worker)
+    
+    def _release_worker(self, worker: _Worker = None):
+        # A killed worker is not returned; its slot is refilled with a fresh process on demand
+        if worker is not None:
+            with self._workers_lock:
+                self._idle_workers.append(worker)
+        self._worker_slots.release()
+    
+    def _evaluate_isolated(self, expressions: list, variables: dict) -> list:
+        """
+        Evaluate in a worker process, each expression within time_budget
+        seconds (less if the agent's deadline is closer). A worker that runs
+        past the budget is killed and the remaining expressions go to a new one.
+        """
+        # Workers start with the first evaluation (not when the tool is built, e.g. to read its schema);
+        # the rest of the pool comes up in the background
+        with self._workers_lock:
+            prestart, self._prestarted = not self._prestarted, True
+        if prestart and self.workers > 1:
+            threading.Thread(target=self._prestart_workers, name="calculator-prestart", daemon=True).start()
+        
+        results = []
+        timeouts = 0
+        while len(results) < len(expressions):
+            pending = expressions[len(results):]
+            try:
+                worker = self._acquire_worker()
+            except Exception as e:
+                results.extend({"expression": item, "error": str(e), "success": False} for item in pending)
+                break
+            try:
+                worker.conn.send((pending, variables))
+                for expression in pending:
+                    budget = self.remaining_time(self.time_budget)
+                    if not worker.conn.poll(budget):
+                        worker.kill()
+                        worker = None
+                        timeouts += 1
+                        results.append(self._too_expensive(
+                            expression, f"Evaluation did not finish within {budget:.1f} seconds"))
+                        break
+                    results.append(worker.conn.recv())
+            except (EOFError, OSError) as e:
+                # The worker died (e.g. out of memory): report the expression it was on and move on
+                if worker is not None:
+                    worker.kill()
+                    worker = None
+                results.append({"expression": expressions[len(results)],
+                                "error": f"Calculator worker failed: {str(e) or type(e).__name__}",
+                                "success": False})
+            finally:
+                self._release_worker(worker)
+        self._count(results, timeouts)
+        return results
+    
+    def execute(self, expression: str = None, expressions: list = None, variables: dict = None) -> dict:
+        """Execute mathematical calculation"""
+        if expression is None and not expressions:
+            return {"error": "Provide an expression or a list of expressions", "success": False}
+        
+        variables = variables or {}
+        try:
+            scope = self._scope(variables)
+        except TooExpensive as e:
+            return {"error": str(e), "error_type": "too_expensive", "success": False}
+        except Exception as e:
+            return {"error": str(e), "success": False}
+        
+        batch = ([expression] if expression is not None else []) + list(expressions or [])
+        if self.isolate:
+            # Parse and cost-check here so rejected expressions never reach a worker
+            results = [None] * len(batch)
+            runnable = []
+            for i, item in enumerate(batch):
+                try:
+                    self.compile_expression(item)
+                    runnable.append(i)
+                except TooExpensive as e:
+                    results[i] = self._too_expensive(item, str(e))
+                except Exception as e:
+                    results[i] = {"expression": item, "error": str(e), "success": False}
+            self._count([result for result in results if result is not None])
+            if runnable:
+                evaluated = self._evaluate_isolated([batch[i] for i in runnable], variables)
+                for i, result in zip(runnable, evaluated):
+                    results[i] = result
+        else:
+            results = [self._evaluate(item, scope) for item in batch]
+            self._count(results)
+        
+        if expressions is None:
+            return results[0]
+        
+        # Batch mode: every expression shares the same variables
+        return {
+            "results": results,
+            "success": all(result["success"] for result in results)
+        }
\ No newline at end of file
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import importlib
+import importlib.util
+import inspect
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from .base_tool import BaseTool
+
+# Entry point group under which installed packages register tools
+ENTRY_POINT_GROUP = 'mao.tools'
+
+MANIFEST_VERSION = 2
+
+class ToolSource:
+    """
+    A place tools come from: a module in tools/, a file in an extra directory
+    or an installed entry point. The fingerprint changes whenever the source
+    may define different tools, which invalidates its manifest entry.
+    """
+
+    def __init__(self, key: str, label: str, fingerprint: list, load: Callable[[], Any]):
+        self.key = key
+        self.label = label
+        self.fingerprint = fingerprint
+        self.load = load
+
+    def tool_class(self, class_name: str) -> type:
+        loaded = self.load()
+        return loaded if isinstance(loaded, type) else getattr(loaded, class_name)
+
+
+class LazyTool(BaseTool):
+    """
+    Stand-in for a tool built from its manifest entry. The schema is served
+    from the manifest; the tool's module (and its dependencies) is imported and
+    the tool instantiated the first time it is executed.
+    """
+
+    def __init__(self, metadata: Dict[str, Any], load: Callable[[], BaseTool], tool: BaseTool = None):
+        self.metadata = metadata
+        self._load = load
+        self._tool = tool
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.metadata["name"]
+
+    @property
+    def description(self) -> str:
+        return self.metadata["description"]
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        return self.metadata["parameters"]
+
+    @property
+    def idempotent(self) -> bool:
+        return self.metadata.get("idempotent", False)
+
+    @property
+    def loaded(self) -> bool:
+        return self._tool is not None
+
+    def load(self) -> BaseTool:
+        """The real tool, imported and instantiated on first use"""
+        if self._tool is None:
+            with self._lock:
+                if self._tool is None:
+                    self._tool = self._load()
+        return self._tool
+
+    def execute(self, **kwargs) -> Any:
+        try:
+            tool = self.load()
+        except Exception as e:
+            return {"error": f"Could not load tool {self.name}: {str(e)}"}
+        return tool.execute(**kwargs)
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        # A tool that was never executed has nothing to report
+        return self._tool.stats() if self._tool is not None else None
+
+
+def tool_classes(loaded: Any) -> List[type]:
+    """
+    Concrete BaseTool subclasses defined in a module (classes it merely imports
+    are left to their own module), or the class itself for an entry point naming
+    one. A module without any, such as a helper module, defines no tools.
+    """
+    if isinstance(loaded, type):
+        candidates = [loaded]
+    else:
+        candidates = [item for item in vars(loaded).values()
+                      if isinstance(item, type) and item.__module__ == loaded.__name__]
+    return [item for item in candidates
+            if issubclass(item, BaseTool) and item is not LazyTool and not inspect.isabstract(item)]
+
+
+def tool_metadata(tool: BaseTool) -> Dict[str, Any]:
+    return {
+        "class": type(tool).__name__,
+        "name": tool.name,
+        "description": tool.description,
+        "parameters": tool.parameters,
+        "idempotent": tool.idempotent
+    }
+
+
+def _file_fingerprint(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _import_file(path: str):
+    """Import a tool module from an arbitrary directory under a stable, unique name"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    module_name = f"mao_tools_{hashlib.sha1(path.encode()).hexdigest()[:8]}_{stem}"
+    module = sys.modules.get(module_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+    return module
+
+
+def _entry_points() -> list:
+    from importlib import metadata
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return list(entry_points.select(group=ENTRY_POINT_GROUP))
+    return list(entry_points.get(ENTRY_POINT_GROUP, []))
+
+
+def tool_sources(config: dict) -> Iterator[ToolSource]:
+    """Every source of tools: the tools package, tools.extra_dirs and mao.tools entry points"""
+    tools_config = config.get('tools', {})
+
+    tools_dir = os.path.dirname(__file__)
+    for filename in sorted(os.listdir(tools_dir)):
+        # Helper modules are sources too; the manifest records that they define no tools
+        if filename.endswith('.py') and filename != '__init__.py':
+            module_name = f'tools.{filename[:-3]}'
+            yield ToolSource(module_name, filename, _file_fingerprint(os.path.join(tools_dir, filename)),
+                             lambda module_name=module_name: importlib.import_module(module_name))
+
+    for directory in tools_config.get('extra_dirs') or []:
+        directory = os.path.abspath(os.path.expanduser(directory))
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.py') and filename != '__init__.py':
+                path = os.path.join(directory, filename)
+                yield ToolSource(path, path, _file_fingerprint(path), lambda path=path: _import_file(path))
+
+    if tools_config.get('entry_points', True):
+        for entry_point in _entry_points():
+            # Installed code only changes with its distribution's version
+            dist = getattr(entry_point, 'dist', None)
+            version = dist.version if dist is not None else None
+            yield ToolSource(f"{ENTRY_POINT_GROUP}:{entry_point.name}={entry_point.value}", entry_point.name,
+                             [version], entry_point.load)
+
+
+def manifest_settings(config: dict) -> Dict[str, Any]:
+    """The tools settings that decide which sources exist; a manifest written under others is discarded"""
+    tools_config = config.get('tools', {})
+    return {
+        "extra_dirs": [os.path.abspath(os.path.expanduser(directory)) for directory in tools_config.get('extra_dirs') or []],
+        "entry_points": bool(tools_config.get('entry_points', True))
+    }
+
+
+def load_manifest(path: str, settings: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Manifest entries by source key ({} when missing, unreadable, from another
+    version or written under different settings).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    if manifest.get("settings") != settings:
+        return {}
+    return manifest.get("sources", {})
+
+
+def save_manifest(path: str, sources: Dict[str, Any], settings: Dict[str, Any] = None):
+    """Atomically replace the manifest; a read-only location just means no caching"""
+    directory = os.path.dirname(path) or '.'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tool_manifest.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "settings": settings, "sources": sources}, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError:
+        pass
+
+
+def lazy_tools(source: ToolSource, entry: Dict[str, Any], config: dict) -> List[LazyTool]:
+    """LazyTools for a source whose manifest entry is still fresh"""
+    return [
+        LazyTool(metadata, lambda class_name=metadata["class"]: source.tool_class(class_name)(config))
+        for metadata in entry["tools"]
+    ]
+
+
+def loaded_tools(source: ToolSource, config: dict, lazy: bool) -> List[BaseTool]:
+    """Import a source and instantiate its tools (wrapped as already-loaded LazyTools when lazy)"""
+    loaded = source.load()
+    tools = []
+    for tool_class in tool_classes(loaded):
+        tool = tool_class(config)
+        if lazy:
+            tool = LazyTool(tool_metadata(tool), lambda tool_class=tool_class: tool_class(config), tool)
+        tools.append(tool)
+    return tools
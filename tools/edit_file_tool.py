@@ -0,0 +1,227 @@
+from .base_tool import BaseTool
+from .atomic import atomic_write, path_lock
+from typing import List, Tuple
+import re
+import os
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+class PatchError(Exception):
+    pass
+
+
+def parse_unified_diff(diff: str) -> List[Tuple[int, List[str], List[str]]]:
+    """Hunks of a single-file unified diff as (old start line, old lines, new lines)"""
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        match = HUNK_HEADER.match(line)
+        if match:
+            current = (int(match.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None or line.startswith('\\'):
+            # File headers ("---", "+++", "diff ...") and "\\ No newline at end of file"
+            continue
+        tag, text = (line[0], line[1:]) if line else (' ', '')
+        if tag == ' ':
+            current[1].append(text)
+            current[2].append(text)
+        elif tag == '-':
+            current[1].append(text)
+        elif tag == '+':
+            current[2].append(text)
+        else:
+            raise PatchError(f"Unexpected line in hunk: {line[:80]!r}")
+    if not hunks:
+        raise PatchError("No @@ hunks found in diff")
+    return hunks
+
+
+def apply_hunks(lines: List[str], hunks: List[Tuple[int, List[str], List[str]]]) -> Tuple[List[str], int]:
+    """
+    Apply hunks to lines (without line endings); all or nothing. A hunk whose
+    context moved is matched at the nearest position. Returns the new lines and
+    the 0-based index of the first changed line.
+    """
+    result = list(lines)
+    shift = 0
+    first_change = None
+    for old_start, old_lines, new_lines in hunks:
+        expected = max(0, old_start - 1 + shift) if old_lines else min(len(result), old_start + shift)
+        position = _find_block(result, old_lines, expected)
+        if position is None:
+            raise PatchError(f"Hunk at line {old_start} does not match the file")
+        result[position:position + len(old_lines)] = new_lines
+        shift += len(new_lines) - len(old_lines)
+        first_change = position if first_change is None else min(first_change, position)
+    return result, first_change or 0
+
+
+def _find_block(lines: List[str], block: List[str], expected: int):
+    """Index where block occurs in lines, preferring the one closest to expected"""
+    if not block:
+        return min(expected, len(lines))
+    size = len(block)
+    for distance in range(len(lines) + 1):
+        for position in (expected - distance, expected + distance) if distance else (expected,):
+            if 0 <= position <= len(lines) - size and lines[position:position + size] == block:
+                return position
+    return None
+
+
+class EditFileTool(BaseTool):
+    def __init__(self, config: dict):
+        self.config = config
+    
+    @property
+    def name(self) -> str:
+        return "edit_file"
+    
+    @property
+    def description(self) -> str:
+        return (
+            "Change part of a file without resending all of it: append text, replace an exact snippet "
+            "(old_text -> new_text; old_text must be unique unless replace_all), or apply a unified diff. "
+            "Returns the edited region, so the file does not need to be read again to check the change."
+        )
+    
+    @property
+    def parameters(self) -> dict:
+        return {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "The file path to edit"
+                },
+                "operation": {
+                    "type": "string",
+                    "enum": ["append", "replace", "patch"],
+                    "description": "append: add content at the end; replace: swap old_text for new_text; patch: apply diff"
+                },
+                "content": {
+                    "type": "string",
+                    "description": "Text to append (append)"
+                },
+                "old_text": {
+                    "type": "string",
+                    "description": "Exact text to find, including whitespace (replace)"
+                },
+                "new_text": {
+                    "type": "string",
+                    "description": "Replacement text (replace)"
+                },
+                "replace_all": {
+                    "type": "boolean",
+                    "description": "Replace every occurrence instead of requiring exactly one (replace)",
+                    "default": False
+                },
+                "diff": {
+                    "type": "string",
+                    "description": "Unified diff for this file with @@ -start,count +start,count @@ hunks (patch)"
+                }
+            },
+            "required": ["path", "operation"]
+        }
+    
+    def _preview(self, text: str, first_line: int, changed_lines: int, context: int = 2) -> str:
+        """Numbered lines around an edit (at most 40, each cut at 200 characters)"""
+        lines = text.splitlines()
+        start = max(0, first_line - context)
+        end = min(len(lines), first_line + changed_lines + context, start + 40)
+        return "\n".join(f"{number + 1}: {lines[number][:200]}" for number in range(start, end))
+    
+    def _append(self, path: str, content: str) -> dict:
+        # Rewritten through a temporary file like the other edits, so a crash never leaves half an append
+        text = ""
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                text = f.read()
+        atomic_write(path, text + content)
+        return {"bytes_written": len(content.encode('utf-8')), "message": f"Appended to {path}"}
+    
+    def _replace(self, path: str, old_text: str, new_text: str, replace_all: bool) -> dict:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        
+        occurrences = text.count(old_text)
+        if occurrences == 0:
+            return {"error": f"old_text not found in {path}"}
+        if occurrences > 1 and not replace_all:
+            return {"error": f"old_text occurs {occurrences} times in {path}; add surrounding lines to make it unique or set replace_all"}
+        
+        first_line = text.count('\n', 0, text.index(old_text))
+        updated = text.replace(old_text, new_text)
+        return {
+            "bytes_written": atomic_write(path, updated),
+            "replacements": occurrences,
+            "preview": self._preview(updated, first_line, new_text.count('\n') + 1),
+            "message": f"Replaced {occurrences} occurrence(s) in {path}"
+        }
+    
+    def _patch(self, path: str, diff: str) -> dict:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        
+        hunks = parse_unified_diff(diff)
+        
+        # Keep the file's line endings and its final newline (or lack of one)
+        newline = '\r\n' if '\r\n' in text else '\n'
+        final_newline = text.endswith(newline) or not text
+        lines = text.split(newline)
+        if final_newline:
+            lines.pop()
+        updated_lines, first_line = apply_hunks(lines, hunks)
+        updated = newline.join(updated_lines) + (newline if final_newline and updated_lines else '')
+        
+        changed = max(len(new_lines) for _, _, new_lines in hunks)
+        return {
+            "bytes_written": atomic_write(path, updated),
+            "hunks": len(hunks),
+            "preview": self._preview(updated, first_line, changed),
+            "message": f"Applied {len(hunks)} hunk(s) to {path}"
+        }
+    
+    def execute(self, path: str, operation: str, content: str = None, old_text: str = None, new_text: str = None,
+                replace_all: bool = False, diff: str = None) -> dict:
+        try:
+            abs_path = os.path.abspath(path)
+            if operation == "append":
+                if content is None:
+                    return {"error": "append needs content"}
+            elif operation == "replace":
+                if not old_text or new_text is None:
+                    return {"error": "replace needs a non-empty old_text and new_text"}
+            elif operation == "patch":
+                if not diff:
+                    return {"error": "patch needs diff"}
+            else:
+                return {"error": f"Unknown operation: {operation} (use append, replace or patch)"}
+            
+            if operation != "append" and not os.path.isfile(abs_path):
+                return {"error": f"File not found: {path}"}
+            
+            # One read-modify-write at a time per file, so parallel agents' edits don't overwrite each other
+            with path_lock(abs_path):
+                if operation == "append":
+                    result = self._append(abs_path, content)
+                elif operation == "replace":
+                    result = self._replace(abs_path, old_text, new_text, replace_all)
+                else:
+                    result = self._patch(abs_path, diff)
+            
+            if "error" in result:
+                return result
+            return {"path": abs_path, "operation": operation, "success": True, **result}
+        
+        except PatchError as e:
+            return {"error": f"Could not apply diff: {str(e)}"}
+        except UnicodeDecodeError as e:
+            return {"error": f"Failed to decode file as UTF-8: {str(e)}"}
+        except PermissionError:
+            return {"error": f"Permission denied editing file: {path}"}
+        except OSError as e:
+            return {"error": f"OS error editing file: {str(e)}"}
+        except Exception as e:
+            return {"error": f"Failed to edit file: {str(e)}"}
@@ -0,0 +1,113 @@
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Elements whose content is never visible page text
+SKIP_TAGS = frozenset(('script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object'))
+
+# Elements that don't separate words (every other tag does)
+INLINE_TAGS = frozenset(('a', 'abbr', 'b', 'bdi', 'bdo', 'cite', 'code', 'data', 'dfn', 'em', 'font', 'i', 'kbd',
+                         'mark', 'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'u', 'var'))
+
+class TextCollector:
+    """
+    Parser target that gathers whitespace-normalised visible text and sets
+    done once more than max_chars characters have been collected.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.done = False
+        self._skip_depth = 0
+        self._separate = False
+
+    def start(self, tag, attrib=None):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag not in INLINE_TAGS:
+            self._separate = True
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag not in INLINE_TAGS:
+            self._separate = True
+
+    def data(self, text: str):
+        if self._skip_depth or self.done:
+            return
+        words = text.split()
+        if not words:
+            self._separate = self._separate or bool(text)
+            return
+
+        if self.parts and (self._separate or text[0].isspace()):
+            self.parts.append(' ')
+            self.length += 1
+        chunk = ' '.join(words)
+        self.parts.append(chunk)
+        self.length += len(chunk)
+        self._separate = text[-1].isspace()
+        if self.length > self.max_chars:
+            self.done = True
+
+    def close(self) -> str:
+        return ''.join(self.parts)
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser front end for a TextCollector"""
+
+    def __init__(self, collector: TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class HTMLTextExtractor:
+    """
+    Incremental visible-text extraction. Feed decoded chunks as they arrive
+    and stop once done is set; no document tree is ever built. Uses lxml's
+    C parser when it is installed and html.parser otherwise.
+    """
+
+    def __init__(self, max_chars: int, backend: str = "auto"):
+        self.collector = TextCollector(max_chars)
+        if backend in ("auto", "lxml") and etree is not None:
+            self.backend = "lxml"
+            self._parser = etree.HTMLParser(target=self.collector, recover=True, no_network=True)
+        else:
+            self.backend = "html.parser"
+            self._parser = _StdlibParser(self.collector)
+
+    @property
+    def done(self) -> bool:
+        return self.collector.done
+
+    def feed(self, text: str):
+        if text:
+            self._parser.feed(text)
+
+    def close(self) -> str:
+        """Flush the parser and return the text collected so far"""
+        try:
+            self._parser.close()
+        except Exception:
+            # lxml raises on documents it could not make sense of; keep what was collected
+            pass
+        return self.collector.close()
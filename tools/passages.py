@@ -0,0 +1,129 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, List
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Words too common to say anything about relevance
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does", "for", "from", "has", "have",
+    "how", "i", "if", "in", "into", "is", "it", "its", "of", "on", "or", "that", "the", "their", "there", "this",
+    "to", "was", "were", "what", "when", "where", "which", "who", "why", "will", "with", "you", "your"
+))
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_passages(text: str, passage_chars: int = 300) -> List[str]:
+    """Split text into passages of whole sentences of roughly passage_chars characters"""
+    passages = []
+    current = ""
+    for sentence in SENTENCE_END.split(text):
+        # Sentences longer than a passage (lists, tables, missing punctuation) are cut at word boundaries
+        while len(sentence) > passage_chars:
+            cut = sentence.rfind(" ", 0, passage_chars)
+            cut = cut if cut > 0 else passage_chars
+            if current:
+                passages.append(current)
+                current = ""
+            passages.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+
+        if current and len(current) + 1 + len(sentence) > passage_chars:
+            passages.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        passages.append(current)
+    return passages
+
+
+class BM25:
+    """Okapi BM25 scores of a query against a fixed set of passages"""
+
+    def __init__(self, passages: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokens) for tokens in passages]
+        self.lengths = [len(tokens) for tokens in passages]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if passages else 0.0
+
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(passages)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def score(self, query_terms: List[str], index: int) -> float:
+        counts = self.term_counts[index]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.average_length or 1))
+        score = 0.0
+        for term in query_terms:
+            frequency = counts.get(term)
+            if frequency:
+                score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+        return score
+
+
+def select_passages(query: str, texts: Dict[str, str], budget: int, passage_chars: int = 300) -> Dict[str, str]:
+    """
+    For each text, the passages most relevant to query that fit in budget
+    characters, kept in document order and joined with "...".
+
+    All texts are scored as one corpus so term rarity reflects every page of
+    a search. Texts already within budget are returned unchanged; a text with
+    no matching passage keeps its beginning.
+    """
+    query_terms = list(dict.fromkeys(tokenize(query)))
+    split = {key: split_passages(text, passage_chars) for key, text in texts.items() if len(text) > budget}
+
+    corpus = [passage for passages in split.values() for passage in passages]
+    bm25 = BM25([tokenize(passage) for passage in corpus])
+
+    selected = {}
+    offset = 0
+    for key, text in texts.items():
+        passages = split.get(key)
+        if passages is None:
+            selected[key] = text
+            continue
+
+        first = offset
+        offset += len(passages)
+        scores = [bm25.score(query_terms, first + i) for i in range(len(passages))]
+        if not any(scores):
+            selected[key] = text[:budget] + "..."
+            continue
+
+        # Best passages first while they fit, then restore reading order
+        chosen = []
+        chosen_terms = []
+        used = 0
+        for i in sorted(range(len(passages)), key=lambda i: scores[i], reverse=True):
+            if scores[i] <= 0:
+                break
+            cost = len(passages[i]) + (5 if chosen else 0)
+            if used + cost > budget:
+                continue
+            # Repeated blocks (teasers, boilerplate) are only worth including once
+            terms = set(bm25.term_counts[first + i])
+            if any(len(terms & other) > 0.8 * len(terms | other) for other in chosen_terms):
+                continue
+            chosen.append(i)
+            chosen_terms.append(terms)
+            used += cost
+        if not chosen:
+            best = max(range(len(passages)), key=lambda i: scores[i])
+            selected[key] = passages[best][:budget] + "..."
+            continue
+
+        chosen.sort()
+        selected[key] = " ... ".join(passages[i] for i in chosen)
+    return selected
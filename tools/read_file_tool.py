@@ -1,9 +1,86 @@
 from .base_tool import BaseTool
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+import threading
+import codecs
+import mmap
 import os
 
+# Block size for reading a file backwards from its end
+TAIL_BLOCK_BYTES = 65536
+
+class LineIndex:
+    """
+    Byte offsets of every stride-th line of one version of a file, extended
+    lazily only as far as reads need it. Seeking to a line then scans at most
+    stride lines from the nearest checkpoint instead of the whole prefix.
+    """
+    
+    def __init__(self, stride: int = 1024):
+        self.stride = stride
+        self.checkpoints = array('Q', [0])
+        self.complete = False
+        self.lock = threading.Lock()
+    
+    def _extend(self, mm: mmap.mmap):
+        position = self.checkpoints[-1]
+        for _ in range(self.stride):
+            newline = mm.find(b'\n', position)
+            if newline == -1:
+                self.complete = True
+                return
+            position = newline + 1
+        if position >= len(mm):
+            self.complete = True
+            return
+        self.checkpoints.append(position)
+    
+    def seek(self, mm: mmap.mmap, line: int) -> Optional[int]:
+        """
+        Byte offset at which line (0-based) starts, or None past the end of the
+        file. Scans at most stride lines from the nearest checkpoint: O(stride)
+        once the index covers the line, plus a one-off extension when it does not.
+        """
+        with self.lock:
+            while len(self.checkpoints) <= line // self.stride and not self.complete:
+                self._extend(mm)
+            checkpoint = min(line // self.stride, len(self.checkpoints) - 1)
+            position = self.checkpoints[checkpoint]
+        
+        for _ in range(line - checkpoint * self.stride):
+            newline = mm.find(b'\n', position)
+            if newline == -1:
+                return None
+            position = newline + 1
+        return position if position < len(mm) else None
+
+
+def _decode(data: bytes, trim_start: bool = False) -> str:
+    """Decode UTF-8, dropping a character cut in half at the end (and, for byte ranges, the start)"""
+    if trim_start:
+        skip = 0
+        while skip < min(3, len(data)) and data[skip] & 0xC0 == 0x80:
+            skip += 1
+        data = data[skip:]
+    return codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+
+
 class ReadFileTool(BaseTool):
     def __init__(self, config: dict):
         self.config = config
+        read_config = config.get('read_file', {})
+        
+        # Hard cap on the bytes of content one call returns. By default it fits the context budget for one
+        # tool result (about 3 bytes per token), so the truncation marker and paging hints reach the model
+        tool_result_tokens = config.get('context', {}).get('tool_result_max_tokens', 4000)
+        self.max_bytes = read_config.get('max_bytes') or tool_result_tokens * 3
+        
+        # Line indexes of recently paged files, keyed on (path, mtime, size) so edits invalidate them
+        self.index_stride = read_config.get('index_stride', 1024)
+        self.index_cache_size = read_config.get('index_cache_size', 32)
+        self._indexes = OrderedDict()
+        self._indexes_lock = threading.Lock()
     
     @property
     def name(self) -> str:
@@ -11,7 +88,15 @@ class ReadFileTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Read the complete contents of a file from the file system. Handles various text encodings and provides detailed error messages if the file cannot be read."
+        return (
+            "Read the contents of a file from the file system. For large files read a part: the first (head) "
+            "or last (tail) N lines, a page of lines (offset/limit) or a byte range (byte_start/byte_end). "
+            "Output is capped; truncated results say how to read the rest."
+        )
+    
+    @property
+    def idempotent(self) -> bool:
+        return True
     
     @property
     def parameters(self) -> dict:
@@ -29,16 +114,111 @@ class ReadFileTool(BaseTool):
                 "tail": {
                     "type": "integer",
                     "description": "If provided, returns only the last N lines of the file"
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "First line to return (0-based); use next_offset from a previous call to continue"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of lines to return from offset"
+                },
+                "byte_start": {
+                    "type": "integer",
+                    "description": "Start of a byte range to read"
+                },
+                "byte_end": {
+                    "type": "integer",
+                    "description": "End (exclusive) of a byte range to read"
                 }
             },
             "required": ["path"]
         }
     
-    def execute(self, path: str, head: int = None, tail: int = None) -> dict:
+    def _line_index(self, path: str, stat: os.stat_result) -> LineIndex:
+        key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+        with self._indexes_lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = LineIndex(self.index_stride)
+                while len(self._indexes) > self.index_cache_size:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(key)
+            return index
+    
+    def _read_lines(self, mm: mmap.mmap, start: int, limit: Optional[int]) -> Tuple[bytes, int, int, bool]:
+        """Whole lines from byte start, up to limit lines and max_bytes: (data, lines, end, truncated)"""
+        position = start
+        lines = 0
+        while position < len(mm) and (limit is None or lines < limit):
+            newline = mm.find(b'\n', position)
+            line_end = len(mm) if newline == -1 else newline + 1
+            if line_end - start > self.max_bytes:
+                if lines == 0:
+                    # A single line longer than the cap: return its beginning
+                    return mm[start:start + self.max_bytes], 0, start + self.max_bytes, True
+                return mm[start:position], lines, position, True
+            position = line_end
+            lines += 1
+        return mm[start:position], lines, position, False
+    
+    def _tail(self, f, size: int, count: int) -> Tuple[bytes, bool]:
+        """Last count lines, reading blocks backwards from the end: (data, truncated)"""
+        blocks = []
+        position = size
+        newlines = 0
+        needed = None
+        while position > 0:
+            block_size = min(TAIL_BLOCK_BYTES, position)
+            position -= block_size
+            f.seek(position)
+            block = f.read(block_size)
+            if needed is None:
+                # A trailing newline ends the last line rather than starting another one
+                needed = count + 1 if block.endswith(b'\n') else count
+            blocks.append(block)
+            newlines += block.count(b'\n')
+            if newlines >= needed or size - position > self.max_bytes:
+                break
+        
+        data = b''.join(reversed(blocks))
+        cut = len(data)
+        for _ in range(needed or 0):
+            cut = data.rfind(b'\n', 0, cut)
+            if cut == -1:
+                break
+        if cut != -1:
+            data = data[cut + 1:]
+        
+        if len(data) <= self.max_bytes:
+            return data, False
+        # Keep the last max_bytes, starting at a line boundary when there is one
+        data = data[-self.max_bytes:]
+        newline = data.find(b'\n')
+        if 0 <= newline < len(data) - 1:
+            data = data[newline + 1:]
+        return data, True
+    
+    def _marker(self, shown: int, size: int) -> str:
+        return (f"[truncated: showing {shown} of {size} bytes; "
+                f"use offset/limit or byte_start/byte_end to read more]")
+    
+    def _append_marker(self, content: str, shown: int, size: int) -> str:
+        return content + ("" if content.endswith("\n") else "\n") + self._marker(shown, size)
+    
+    def execute(self, path: str, head: int = None, tail: int = None, offset: int = None, limit: int = None,
+                byte_start: int = None, byte_end: int = None) -> dict:
         try:
             # Validate parameters
             if head is not None and tail is not None:
                 return {"error": "Cannot specify both head and tail parameters"}
+            line_paging = offset is not None or limit is not None
+            byte_range = byte_start is not None or byte_end is not None
+            if sum((head is not None or tail is not None, line_paging, byte_range)) > 1:
+                return {"error": "Use only one of head/tail, offset/limit or byte_start/byte_end"}
+            if any(value is not None and value < 0 for value in (head, tail, offset, limit, byte_start, byte_end)):
+                return {"error": "head, tail, offset, limit, byte_start and byte_end must not be negative"}
             
             # Check if file exists
             if not os.path.exists(path):
@@ -48,36 +228,69 @@ class ReadFileTool(BaseTool):
             if not os.path.isfile(path):
                 return {"error": f"Path is not a file: {path}"}
             
-            # Read file with appropriate method
-            if head is not None:
-                # Read first N lines
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = []
-                    for i in range(head):
-                        line = f.readline()
-                        if not line:  # EOF reached
-                            break
-                        lines.append(line)
-                    content = ''.join(lines).rstrip('\n')
-            elif tail is not None:
-                # Read last N lines
-                with open(path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    content = ''.join(lines[-tail:]).rstrip('\n') if lines else ""
-            else:
-                # Read entire file
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+            result = {"path": path, "success": True}
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                size = stat.st_size
+                result["size"] = size
+                
+                if tail is not None:
+                    # Read last N lines without touching the rest of the file
+                    data, truncated = self._tail(f, size, tail) if tail else (b"", False)
+                    content = _decode(data, trim_start=truncated).rstrip('\r\n')
+                    if truncated:
+                        content = self._marker(len(data), size) + "\n" + content
+                elif head is not None or line_paging or byte_range:
+                    if size == 0:
+                        result.update(content="", truncated=False)
+                        return result
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if byte_range:
+                            start = min(byte_start or 0, size)
+                            end = min(size, byte_end if byte_end is not None else start + self.max_bytes)
+                            end = max(start, min(end, start + self.max_bytes))
+                            content = _decode(mm[start:end], trim_start=start > 0)
+                            truncated = byte_end is not None and end < min(byte_end, size)
+                            result.update(byte_start=start, byte_end=end)
+                        else:
+                            # head is a page at line 0; other pages seek through the cached line index
+                            first_line = offset or 0
+                            limit = head if head is not None else limit
+                            start = self._line_index(path, stat).seek(mm, first_line) if first_line else 0
+                            if start is None:
+                                data, lines, end, truncated = b"", 0, size, False
+                            else:
+                                data, lines, end, truncated = self._read_lines(mm, start, limit)
+                            content = _decode(data)
+                            if head is not None:
+                                content = content.rstrip('\r\n')
+                            result.update(offset=first_line, lines=lines,
+                                          next_offset=first_line + lines if end < size else None)
+                            if truncated and lines == 0:
+                                # Only part of one very long line: continue with a byte range
+                                result["next_byte_start"] = end
+                    if truncated:
+                        content = self._append_marker(content, len(content.encode('utf-8')), size)
+                else:
+                    # Read the file, but never more than the cap
+                    data = f.read(self.max_bytes + 1)
+                    truncated = len(data) > self.max_bytes
+                    if truncated:
+                        data = data[:self.max_bytes]
+                        # End on a line boundary when there is one
+                        newline = data.rfind(b'\n')
+                        if newline > 0:
+                            data = data[:newline + 1]
+                    content = _decode(data) if truncated else data.decode('utf-8')
+                    if truncated:
+                        content = self._append_marker(content, len(data), size)
             
-            return {
-                "path": path,
-                "content": content,
-                "success": True
-            }
+            result.update(content=content, truncated=truncated)
+            return result
         
         except UnicodeDecodeError as e:
             return {"error": f"Failed to decode file as UTF-8: {str(e)}"}
         except PermissionError:
             return {"error": f"Permission denied reading file: {path}"}
         except Exception as e:
-            return {"error": f"Failed to read file: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Failed to read file: {str(e)}"}
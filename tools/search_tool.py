@@ -1,12 +1,64 @@
 from .base_tool import BaseTool
+from .cache import cache_from_config
+from .html_text import HTMLTextExtractor
+from .passages import select_passages
 from ddgs import DDGS
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from tracing import current_span
 import requests
+import threading
+import codecs
 import json
+import time
+
+# Content types whose text is worth extracting; anything else (PDFs, images, archives) is skipped unread
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+TEXT_CONTENT_TYPES = HTML_CONTENT_TYPES + ('text/plain',)
+
+# Bytes read from the socket per step of a streamed page fetch
+FETCH_CHUNK_BYTES = 16384
 
 class SearchTool(BaseTool):
     def __init__(self, config: dict):
         self.config = config
+        search_config = config.get('search', {})
+        
+        # DuckDuckGo query timeout, per-request socket timeout and overall budget for fetching all result pages
+        self.search_timeout = search_config.get('search_timeout', 5)
+        self.fetch_timeout = search_config.get('fetch_timeout', 10)
+        self.fetch_deadline = search_config.get('fetch_deadline', 15)
+        
+        # Pages are streamed: reading stops at max_page_bytes or once extract_chars of text are extracted
+        self.max_page_bytes = search_config.get('max_page_bytes', 1048576)
+        self.extract_chars = search_config.get('extract_chars', 20000)
+        self.parser = search_config.get('parser', 'auto')
+        
+        # Each page returns its passages most relevant to the query, up to content_chars
+        self.content_chars = search_config.get('content_chars', 1000)
+        self.passage_chars = search_config.get('passage_chars', 300)
+        
+        # Totals across all fetched pages, reported by stats()
+        self._stats_lock = threading.Lock()
+        self.fetch_stats = {"pages": 0, "bytes": 0, "cpu_seconds": 0.0, "stopped_early": 0, "byte_capped": 0,
+                            "skipped": 0}
+        
+        # Keep-alive connection pool shared by every agent using this tool instance
+        pool_size = search_config.get('pool_size', 16)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = search_config.get('user_agent', 'Mozilla/5.0')
+        
+        # Page fetches for one search run concurrently on this pool
+        self.fetch_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="fetch")
+        
+        # Query -> results and URL -> page text cache (None when disabled)
+        cache_config = config.get('cache', {})
+        self.cache = cache_from_config(config)
+        self.query_ttl = cache_config.get('query_ttl', 3600)
+        self.page_ttl = cache_config.get('page_ttl', 86400)
     
     @property
     def name(self) -> str:
@@ -16,6 +68,10 @@ class SearchTool(BaseTool):
     def description(self) -> str:
         return "Search the web using DuckDuckGo for current information"
     
+    @property
+    def idempotent(self) -> bool:
+        return True
+    
     @property
     def parameters(self) -> dict:
         return {
@@ -34,57 +90,165 @@ class SearchTool(BaseTool):
             "required": ["query"]
         }
     
+    def _fetch_content(self, url: str, timeout: float, deadline: float) -> tuple:
+        """Stream a page and return its cleaned text together with its fetch metrics"""
+        metrics = {"url": url, "bytes": 0, "cpu_ms": 0.0, "stopped": None}
+        with self.session.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            
+            # Skip PDFs and other binaries without reading their body
+            content_type, _, params = (response.headers.get('Content-Type') or 'text/html').partition(';')
+            content_type = content_type.strip().lower()
+            if content_type not in TEXT_CONTENT_TYPES:
+                metrics.update(stopped="content_type", content_type=content_type)
+                self._record_fetch(metrics)
+                return None, metrics
+            
+            charset = 'utf-8'
+            for param in params.split(';'):
+                name, _, value = param.partition('=')
+                if name.strip().lower() == 'charset' and value.strip():
+                    charset = value.strip().strip('"\'')
+            try:
+                decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            
+            # Parse while downloading and stop as soon as there is enough text
+            extractor = HTMLTextExtractor(self.extract_chars, self.parser)
+            feed = extractor.feed if content_type in HTML_CONTENT_TYPES else extractor.collector.data
+            cpu_start = time.thread_time()
+            for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+                chunk = chunk[:self.max_page_bytes - metrics["bytes"]]
+                metrics["bytes"] += len(chunk)
+                feed(decoder.decode(chunk))
+                if extractor.done:
+                    metrics["stopped"] = "enough_text"
+                    break
+                if metrics["bytes"] >= self.max_page_bytes:
+                    metrics["stopped"] = "max_bytes"
+                    break
+                if time.monotonic() >= deadline:
+                    metrics["stopped"] = "deadline"
+                    break
+            text = extractor.close()
+            metrics["cpu_ms"] = round((time.thread_time() - cpu_start) * 1000, 3)
+        
+        self._record_fetch(metrics)
+        return text[:self.extract_chars], metrics
+    
+    def _record_fetch(self, metrics: dict):
+        with self._stats_lock:
+            self.fetch_stats["pages"] += 1
+            self.fetch_stats["bytes"] += metrics["bytes"]
+            self.fetch_stats["cpu_seconds"] += metrics["cpu_ms"] / 1000
+            if metrics["stopped"] == "enough_text":
+                self.fetch_stats["stopped_early"] += 1
+            elif metrics["stopped"] == "max_bytes":
+                self.fetch_stats["byte_capped"] += 1
+            elif metrics["stopped"] == "content_type":
+                self.fetch_stats["skipped"] += 1
+    
+    def stats(self) -> dict:
+        """Page fetch totals (pages, bytes read, extraction CPU time, why reads stopped) and cache counters"""
+        with self._stats_lock:
+            stats = dict(self.fetch_stats)
+        stats["cpu_seconds"] = round(stats["cpu_seconds"], 3)
+        if self.cache:
+            stats["cache"] = self.cache.stats()
+        return stats
+    
+    def _search(self, query: str, max_results: int, timeout: float) -> list:
+        """Run the DuckDuckGo search, going through the cache first"""
+        cache_key = json.dumps([query, max_results])
+        if self.cache:
+            cached = self.cache.get('query', cache_key)
+            if cached is not None:
+                return cached
+        
+        # Use ddgs library
+        ddgs = DDGS(timeout=timeout)
+        results = [
+            {"title": result['title'], "href": result['href'], "body": result['body']}
+            for result in ddgs.text(query, max_results=max_results) or []
+        ]
+        
+        if self.cache and results:
+            self.cache.set('query', cache_key, results, self.query_ttl)
+        return results
+    
     def execute(self, query: str, max_results: int = 5) -> list:
         """Search the web using DuckDuckGo and fetch page content"""
         try:
-            # Use ddgs library
-            ddgs = DDGS()
-            results = ddgs.text(query, max_results=max_results)
+            # Never outlive the calling agent's deadline
+            search_timeout = self.remaining_time(self.search_timeout)
+            if search_timeout <= 0:
+                return [{"error": "Search skipped: the agent's deadline has passed"}]
+            results = self._search(query, max_results, search_timeout)
+            fetch_deadline = self.remaining_time(self.fetch_deadline)
+            fetch_timeout = max(0.1, min(self.fetch_timeout, fetch_deadline))
+            
+            # Serve cached page text directly and fetch the rest all at once
+            contents = {}
+            page_texts = {}
+            futures = {}
+            page_metrics = []
+            deadline = time.monotonic() + fetch_deadline
+            for result in results:
+                url = result['href']
+                cached = self.cache.get('page_text', url) if self.cache else None
+                if cached is not None:
+                    page_texts[url] = cached
+                elif url not in futures:
+                    futures[url] = self.fetch_executor.submit(self._fetch_content, url, fetch_timeout, deadline)
+            
+            # Whatever misses the deadline keeps only its snippet
+            wait(futures.values(), timeout=fetch_deadline)
+            for url, future in futures.items():
+                if future.done():
+                    try:
+                        text, metrics = future.result()
+                        page_metrics.append(metrics)
+                        if text is None:
+                            contents[url] = f"Skipped: unsupported content type {metrics['content_type']}"
+                            continue
+                        page_texts[url] = text
+                        if self.cache:
+                            # Cache the full extracted text; passages depend on the query
+                            self.cache.set('page_text', url, text, self.page_ttl)
+                    except Exception as e:
+                        # If we can't fetch the page, still include the search result
+                        contents[url] = f"Could not fetch content: {str(e)}"
+                else:
+                    future.cancel()
+                    contents[url] = f"Could not fetch content: no response within {fetch_deadline:.1f}s"
+            
+            # Keep only the passages that best match the query instead of each page's first characters
+            rank_start = time.thread_time()
+            contents.update(select_passages(query, page_texts, self.content_chars, self.passage_chars))
+            rank_cpu_ms = round((time.thread_time() - rank_start) * 1000, 3)
+            
+            # Per-page bytes and extraction CPU time on the tool.call span
+            span = current_span.get()
+            if span is not None:
+                span.set(rank_cpu_ms=rank_cpu_ms)
+                if page_metrics:
+                    span.set(pages=page_metrics, page_bytes=sum(m["bytes"] for m in page_metrics),
+                             page_cpu_ms=round(sum(m["cpu_ms"] for m in page_metrics), 3))
             
             simplified_results = []
             
             for result in results:
-                try:
-                    # Fetch content with requests
-                    response = requests.get(
-                        result['href'], 
-                        headers={'User-Agent': self.config.get('search', {}).get('user_agent', 'Mozilla/5.0')},
-                        timeout=10
-                    )
-                    response.raise_for_status()
-                    
-                    # Parse HTML with BeautifulSoup
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Remove script and style elements
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    # Get text content
-                    text = soup.get_text()
-                    # Clean up whitespace
-                    text = ' '.join(text.split())
-                    
-                    # Limit content length
-                    content_snippet = text[:1000] + "..." if len(text) > 1000 else text
-                    
-                    simplified_results.append({
-                        "title": result['title'],
-                        "url": result['href'],
-                        "snippet": result['body'],
-                        "content": content_snippet
-                    })
+                content = contents[result['href']]
                 
-                except Exception as e:
-                    # If we can't fetch the page, still include the search result
-                    simplified_results.append({
-                        "title": result['title'],
-                        "url": result['href'],
-                        "snippet": result['body'],
-                        "content": f"Could not fetch content: {str(e)}"
-                    })
+                simplified_results.append({
+                    "title": result['title'],
+                    "url": result['href'],
+                    "snippet": result['body'],
+                    "content": content
+                })
             
             return simplified_results
         
         except Exception as e:
-            return [{"error": f"Search failed: {str(e)}"}]
\ No newline at end of file
+            return [{"error": f"Search failed: {str(e)}"}]
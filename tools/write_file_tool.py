@@ -1,6 +1,6 @@
 from .base_tool import BaseTool
+from .atomic import atomic_write, path_lock
 import os
-import tempfile
 
 class WriteFileTool(BaseTool):
     def __init__(self, config: dict):
@@ -12,7 +12,7 @@ class WriteFileTool(BaseTool):
     
     @property
     def description(self) -> str:
-        return "Create a new file or completely overwrite an existing file with new content. Use with caution as it will overwrite existing files without warning."
+        return "Create a new file or completely overwrite an existing file with new content. Use with caution as it will overwrite existing files without warning. To change part of an existing file use edit_file instead."
     
     @property
     def parameters(self) -> dict:
@@ -36,35 +36,16 @@ class WriteFileTool(BaseTool):
             # Get absolute path
             abs_path = os.path.abspath(path)
             
-            # Create parent directories if needed
-            parent_dir = os.path.dirname(abs_path)
-            if parent_dir and not os.path.exists(parent_dir):
-                os.makedirs(parent_dir, exist_ok=True)
+            # Write file atomically through a uniquely named temporary file
+            with path_lock(abs_path):
+                bytes_written = atomic_write(abs_path, content)
             
-            # Write file atomically using temporary file
-            temp_path = abs_path + '.tmp'
-            try:
-                with open(temp_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                # Atomic rename
-                os.rename(temp_path, abs_path)
-                
-                return {
-                    "path": abs_path,
-                    "bytes_written": len(content.encode('utf-8')),
-                    "success": True,
-                    "message": f"Successfully wrote to {path}"
-                }
-            
-            except Exception as e:
-                # Clean up temp file if it exists
-                if os.path.exists(temp_path):
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
-                raise e
+            return {
+                "path": abs_path,
+                "bytes_written": bytes_written,
+                "success": True,
+                "message": f"Successfully wrote to {path}"
+            }
         
         except PermissionError:
             return {"error": f"Permission denied writing to file: {path}"}
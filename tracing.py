@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from typing import Any, Dict, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+# Innermost active span; asyncio tasks and run_blocking calls inherit it, so nesting follows the call graph
+current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation with attributes, linked to its parent by span id"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "status", "_started")
+
+    recording = True
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes
+        self.status = "ok"
+        self._started = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        """Seconds between start and end (or now, while still open)"""
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self._started
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is off: entering, leaving and setting cost almost nothing"""
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    """Context manager that makes a span current for its block"""
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = current_span.set(self.span)
+        self.tracer._start(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end = time.perf_counter()
+        if exc_type is not None:
+            span.status = "error"
+            span.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        current_span.reset(self._token)
+        self.tracer._end(span)
+        return False
+
+
+class Tracer:
+    """
+    Creates spans and hands them to exporters.
+    Without exporters the tracer is disabled and span() returns a shared no-op.
+    """
+
+    def __init__(self, exporters: List[Any] = ()):
+        self.exporters = list(exporters)
+        self.enabled = bool(self.exporters)
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a block as a child of the current span"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return _ActiveSpan(self, Span(name, current_span.get(), attributes))
+
+    def _start(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.start(span)
+            except Exception:
+                # A broken exporter must never fail the traced operation
+                pass
+
+    def _end(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                pass
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to a file"""
+
+    def __init__(self, path: str):
+        parent_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent_dir, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+
+    def start(self, span: Span):
+        pass
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetryExporter:
+    """
+    Mirrors spans into the OpenTelemetry API, keeping their parent/child structure.
+    Where they go is decided by the OpenTelemetry SDK configured in the process.
+    """
+
+    def __init__(self, service_name: str = "mao"):
+        if otel_trace is None:
+            raise ImportError("opentelemetry-api is required for the OpenTelemetry exporter")
+        self._tracer = otel_trace.get_tracer(service_name)
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def start(self, span: Span):
+        with self._lock:
+            parent = self._spans.get(span.parent_id)
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self._tracer.start_span(span.name, context=context, start_time=int(span.start * 1e9))
+        with self._lock:
+            self._spans[span.span_id] = otel_span
+
+    def export(self, span: Span):
+        with self._lock:
+            otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value if isinstance(value, (bool, int, float, str)) else str(value))
+        if span.status == "error":
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.attributes.get("error")))
+        otel_span.end(end_time=int((span.start + span.duration) * 1e9))
+
+    def close(self):
+        pass
+
+
+def tracer_from_config(config: dict) -> Tracer:
+    """Build the tracer described by the `tracing` config section (disabled by default)"""
+    tracing_config = config.get('tracing', {})
+    if not tracing_config.get('enabled', False):
+        return Tracer()
+
+    exporters = []
+    if tracing_config.get('path', 'traces.jsonl'):
+        exporters.append(JsonlExporter(tracing_config.get('path', 'traces.jsonl')))
+    if tracing_config.get('opentelemetry', False):
+        exporters.append(OpenTelemetryExporter(tracing_config.get('service_name', 'mao')))
+    return Tracer(exporters)